@@ -1,20 +1,22 @@
 import pandas as pd
 import numpy as np
-from faker import Faker
 import random
 from datetime import datetime, timedelta
 import os
+import sys
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Define the data directory relative to this script: ../data
 DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
+# Shared registry types live next to the models: ../models
+sys.path.append(os.path.join(os.path.dirname(SCRIPT_DIR), 'models'))
+from registry import build_agent_registry, build_task_registry
+from volume_pattern import daily_volume_weights
 # Ensure data directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# Initialize Faker and seed for reproducibility
-fake = Faker()
-Faker.seed(42)
+# Seed for reproducibility
 np.random.seed(42)
 random.seed(42)
 
@@ -61,18 +63,7 @@ def generate_tasks(n=5000):
     # Generate probabilities for each day in the past 365 days
     days = np.arange(365)
     dates = [start_date + timedelta(days=int(d)) for d in days]
-    
-    # 1. Annual Pattern (Sine wave with peak around day 360 - Winter)
-    annual_pattern = 1 + 0.5 * np.sin((days / 365) * 2 * np.pi - np.pi/2)
-    
-    # 2. Weekly Pattern (Mon=0, Sun=6)
-    # Weights: Mon(1.3), Tue(1.2), Wed(1.0), Thu(1.0), Fri(0.8), Sat(0.2), Sun(0.1)
-    # This creates a "Working Week" pattern
-    week_weights = [1.3, 1.2, 1.0, 1.0, 0.8, 0.2, 0.1]
-    daily_weights = np.array([week_weights[d.weekday()] for d in dates])
-    
-    # 3. Combined Probability
-    probs = annual_pattern * daily_weights
+    probs = daily_volume_weights(dates)
     probs /= probs.sum() # Normalize
     
     # Sample dates based on these probabilities
@@ -111,21 +102,29 @@ def generate_interactions(n=100000, agents_df=None, tasks_df=None):
     print(f"Generating {n} Interactions with STRONG time-series patterns for R2>0.85...")
     interactions = []
     
-    agent_ids = agents_df['agent_id'].tolist()
-    task_ids = tasks_df['task_id'].tolist()
-    tasks_dict = tasks_df.set_index('task_id').to_dict('index')
-    agents_dict = agents_df.set_index('agent_id').to_dict('index')
+    # Array-backed lookups instead of one dict per row.
+    # Registry codes are row positions, so drawing a code is drawing an id.
+    tasks = build_task_registry(tasks_df)
+    agents = build_agent_registry(agents_df)
+    task_entry_dates = tasks.columns['entry_date']
+    task_risk_scores = tasks.columns['risk_score']
+    
+    # Agent Skill (0-3 scale: Junior=0, Mid=1, Senior=2, Specialist=3)
+    skill_map = {'Junior': 0.3, 'Mid': 0.5, 'Senior': 0.7, 'Specialist': 0.9}
+    skill_by_code = np.array([skill_map.get(s, 0.5) for s in agents.categories['skill_level']])
+    agent_skill_vals = skill_by_code[agents.columns['skill_level']]
     
     # 1. Pre-calculate "Weekly Efficiency" for each agent to ensure forecastability
     # Create a sine wave + trend for each agent
-    agent_curves = {}
-    for aid in agent_ids:
+    # One (base, freq, phase) row per agent code
+    agent_curves = np.empty((len(agents), 3))
+    for a in range(len(agents)):
         # Base efficiency HUGE BOOST for signal
         base = np.random.uniform(0.4, 0.6)
         # Unique frequency and phase
         freq = np.random.uniform(0.05, 0.2)
         phase = np.random.uniform(0, 6)
-        agent_curves[aid] = (base, freq, phase)
+        agent_curves[a] = (base, freq, phase)
         
     action_types = ['Call', 'Email', 'SMS', 'Legal Notice']
     base_outcomes = ['PTP', 'Paid', 'Refusal', 'No Answer', 'Voicemail']
@@ -136,28 +135,25 @@ def generate_interactions(n=100000, agents_df=None, tasks_df=None):
     # Generate progressively
     while total_generated < n:
         # Pick random agent
-        agent_id = np.random.choice(agent_ids)
-        task_id = np.random.choice(task_ids)
-        task = tasks_dict[task_id]
+        a = np.random.choice(len(agents))
+        t = np.random.choice(len(tasks))
+        agent_id = agents.ids[a]
+        task_id = tasks.ids[t]
         
         # Interaction time
         days_after = int(np.random.exponential(scale=15))
-        timestamp = pd.to_datetime(task['entry_date']) + timedelta(days=days_after)
+        timestamp = pd.to_datetime(task_entry_dates[t]) + timedelta(days=days_after)
         
         # Calculate Agent's "Target Success Rate" for this specific week
         week_num = timestamp.isocalendar()[1] + timestamp.year * 52
-        base, freq, phase = agent_curves[agent_id]
+        base, freq, phase = agent_curves[a]
         
         # Deterministic match score for high ML accuracy (Allocator)
-        # Agent Skill (0-3 scale: Junior=0, Mid=1, Senior=2, Specialist=3)
         # Risk Score (Inverse: Low Risk is better)
-        
-        agent_skill_str = agents_dict[agent_id]['skill_level']
-        skill_map = {'Junior': 0.3, 'Mid': 0.5, 'Senior': 0.7, 'Specialist': 0.9}
-        skill_val = skill_map.get(agent_skill_str, 0.5)
+        skill_val = agent_skill_vals[a]
         
         # Risk factor: 300(Low) -> 0.9, 850(High) -> 0.3
-        risk_norm = 1.0 - ((task['risk_score'] - 300) / 600.0) 
+        risk_norm = 1.0 - ((task_risk_scores[t] - 300) / 600.0) 
         risk_val = max(0.1, min(0.9, risk_norm))
         
         # Time seasonality (from Sine wave)
@@ -198,6 +194,11 @@ def generate_interactions(n=100000, agents_df=None, tasks_df=None):
 
 
 def main():
+    # Faker is only needed when generating a dataset, not by modules that
+    # import the volume patterns from here
+    from faker import Faker
+    Faker.seed(42)
+    
     # 1. Agents
     agents_df = generate_agents(50)
     agents_path = os.path.join(DATA_DIR, 'agents.csv')
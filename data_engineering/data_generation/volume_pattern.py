@@ -0,0 +1,24 @@
+"""
+Seasonal and weekly task volume pattern, shared by the dataset generator and
+the allocation simulator. Importing it has no side effects.
+"""
+import numpy as np
+
+def daily_volume_weights(dates, year_days=365):
+    """
+    Relative task volume of each date (unnormalized).
+    Day i of the list is treated as day i of the seasonal year.
+    """
+    days = np.arange(len(dates))
+    
+    # 1. Annual Pattern (Sine wave with peak around day 360 - Winter)
+    annual_pattern = 1 + 0.5 * np.sin((days / year_days) * 2 * np.pi - np.pi/2)
+    
+    # 2. Weekly Pattern (Mon=0, Sun=6)
+    # Weights: Mon(1.3), Tue(1.2), Wed(1.0), Thu(1.0), Fri(0.8), Sat(0.2), Sun(0.1)
+    # This creates a "Working Week" pattern
+    week_weights = np.array([1.3, 1.2, 1.0, 1.0, 0.8, 0.2, 0.1])
+    daily_weights = week_weights[[d.weekday() for d in dates]]
+    
+    # 3. Combined Probability
+    return annual_pattern * daily_weights
@@ -0,0 +1,238 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+
+from registry import Registry
+
+# --- CONFIG ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
+STATS_SNAPSHOT_PATH = os.path.join(SCRIPT_DIR, 'agent_stats.npz')
+
+COUNTERS = {'assigned': np.int64, 'active': np.int64, 'paid': np.int64,
+            'risk_sum': np.float64, 'days_to_pay_sum': np.float64}
+
+def _day(ts):
+    # Days since epoch for a date / timestamp / 'YYYY-MM-DD' string (ints pass through)
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    return int(np.datetime64(pd.Timestamp(ts), 'D').astype(np.int64))
+
+class AgentStats:
+    """
+    Per-agent counters materialized from the assignment / interaction event
+    stream, instead of re-aggregating the full case history on every
+    allocation (as /api/allocate does).
+
+    Every event is O(1) (amortized for a first-seen agent): counters live in
+    arrays indexed by the agent's code, with spare rows for new agents, and
+    are exposed as an agent-id Registry (`agents`). Each open task remembers its agent, the day it
+    was first assigned and its risk score. A payment closes the task: it is
+    counted once, for the agent holding the task, and later events on the
+    task are ignored (like a case with status 'Paid' in server.js).
+
+    Counters per agent:
+        assigned          tasks ever assigned
+        active            tasks currently held and not yet paid / closed
+        paid              tasks that ended in 'Paid' while held
+        risk_sum          sum of risk_score over assigned tasks
+        days_to_pay_sum   sum of (paid day - first assignment day) over paid tasks
+    Derived: recovery_rate, mean_risk_handled, mean_days_to_pay (see table()).
+    """
+
+    def __init__(self, agent_ids=()):
+        self._ids = np.asarray(agent_ids, dtype=str).tolist()
+        self._codes = {a_id: i for i, a_id in enumerate(self._ids)}
+        # Counter arrays with spare rows for agents seen later (see _agent_code)
+        capacity = max(len(self._ids), 16)
+        self._counters = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COUNTERS.items()}
+        self._registry = None
+        # task_id -> [agent code, assigned day, risk score, paid]
+        self.tasks = {}
+        self.events = 0
+        self.last_day = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def agents(self):
+        """Registry of the agents seen so far, over the counter arrays; rebuilt only after new agents."""
+        n = len(self._ids)
+        if self._registry is None or len(self._registry) != n:
+            self._registry = Registry(np.asarray(self._ids, dtype=str),
+                                      {name: arr[:n] for name, arr in self._counters.items()})
+        return self._registry
+
+    def _agent_code(self, agent_id):
+        code = self._codes.get(agent_id)
+        if code is None:
+            # New agent: amortized O(1), the counter arrays double when full
+            code = len(self._ids)
+            if code == len(self._counters['assigned']):
+                self._counters = {name: np.concatenate([arr, np.zeros_like(arr)])
+                                  for name, arr in self._counters.items()}
+            self._ids.append(str(agent_id))
+            self._codes[agent_id] = code
+        return code
+
+    # --- EVENTS ---
+    def assign(self, task_id, agent_id, day, risk_score=0.0):
+        """Task assigned (or re-assigned) to an agent. `day` is a date or days since epoch."""
+        self._assign(task_id, self._agent_code(agent_id), _day(day), float(risk_score))
+
+    def _assign(self, task_id, code, day, risk):
+        cols = self._counters
+        state = self.tasks.get(task_id)
+        if state is not None:
+            if state[0] == code or state[3]:
+                # Paid tasks are closed: later touches don't reopen them,
+                # but they still count as events
+                self._tick(day)
+                return
+            # Re-assignment moves the open task off the previous agent,
+            # days to pay still count from the first assignment
+            cols['active'][state[0]] -= 1
+            state[0] = code
+        else:
+            self.tasks[task_id] = [code, day, risk, False]
+        cols['assigned'][code] += 1
+        cols['active'][code] += 1
+        cols['risk_sum'][code] += risk
+        self._tick(day)
+
+    def outcome(self, task_id, outcome, day, agent_id=None):
+        """
+        Interaction outcome on a task. An agent other than the current holder
+        takes the task over first. 'Paid' closes the task for its holder;
+        events on a task that is already paid are ignored.
+        """
+        day = _day(day)
+        if agent_id is not None:
+            code = self._agent_code(agent_id)
+            state = self.tasks.get(task_id)
+            if state is None or state[0] != code:
+                self._assign(task_id, code, day, state[2] if state is not None else 0.0)
+        self._outcome(task_id, outcome, day)
+
+    def _outcome(self, task_id, outcome, day):
+        state = self.tasks.get(task_id)
+        if state is not None and outcome == 'Paid' and not state[3]:
+            cols = self._counters
+            cols['paid'][state[0]] += 1
+            cols['active'][state[0]] -= 1
+            cols['days_to_pay_sum'][state[0]] += day - state[1]
+            state[3] = True
+        self._tick(day)
+
+    def close(self, task_id):
+        """Task closed without payment (written off, recalled): frees the agent."""
+        state = self.tasks.pop(task_id, None)
+        if state is not None and not state[3]:
+            self._counters['active'][state[0]] -= 1
+        self.events += 1
+
+    def _tick(self, day):
+        self.events += 1
+        if self.last_day is None or day > self.last_day:
+            self.last_day = day
+
+    def replay_interactions(self, interactions_df, tasks_df=None, snapshot_every=None, snapshot_path=STATS_SNAPSHOT_PATH):
+        """
+        Applies an interactions log (task_id, agent_id, outcome, timestamp) in
+        time order. tasks_df, if given, supplies the risk_score of each task.
+        With snapshot_every, a snapshot is saved every that many events.
+        """
+        log = interactions_df.sort_values('timestamp', kind='stable')
+        days = log['timestamp'].to_numpy(dtype='datetime64[D]').astype(np.int64).tolist()
+        risk = {}
+        if tasks_df is not None:
+            risk = dict(zip(tasks_df['task_id'].tolist(), tasks_df['risk_score'].astype(float).tolist()))
+
+        next_snapshot = self.events + snapshot_every if snapshot_every else None
+        for t_id, a_id, outcome, day in zip(log['task_id'].tolist(), log['agent_id'].tolist(),
+                                            log['outcome'].tolist(), days):
+            code = self._agent_code(a_id)
+            state = self.tasks.get(t_id)
+            if state is None or state[0] != code:
+                self._assign(t_id, code, day, risk.get(t_id, 0.0))
+            self._outcome(t_id, outcome, day)
+            if next_snapshot is not None and self.events >= next_snapshot:
+                self.save(snapshot_path)
+                next_snapshot += snapshot_every
+        return len(log)
+
+    def record_assignments(self, task_ids, agent_ids, risk_scores=None, day=None):
+        """Bulk assign events, e.g. the output of SmartAllocator.allocate_bulk."""
+        day = _day(day if day is not None else pd.Timestamp.now())
+        risk_scores = np.zeros(len(task_ids)) if risk_scores is None else np.asarray(risk_scores, dtype=np.float64)
+        for t_id, a_id, r in zip(list(task_ids), list(agent_ids), risk_scores.tolist()):
+            self._assign(t_id, self._agent_code(a_id), day, r)
+
+    # --- QUERIES ---
+    def workload(self, agent_ids):
+        """Active task count per agent id (0 for agents without events), as a new int64 array."""
+        codes = self.agents.codes(agent_ids, missing=-1)
+        return np.where(codes >= 0, self.agents.columns['active'][codes], 0).astype(np.int64)
+
+    def table(self, agent_ids=None):
+        """Counters and derived features per agent, indexed by agent_id."""
+        ids = self.agents.ids if agent_ids is None else np.asarray(agent_ids, dtype=str)
+        codes = self.agents.codes(ids, missing=-1)
+        known = codes >= 0
+        df = pd.DataFrame(index=pd.Index(ids, name='agent_id'))
+        for name, arr in self.agents.columns.items():
+            df[name] = np.where(known, arr[codes], 0).astype(arr.dtype)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['recovery_rate'] = np.where(df['assigned'] > 0, df['paid'] / df['assigned'], 0.0)
+            df['mean_risk_handled'] = np.where(df['assigned'] > 0, df['risk_sum'] / df['assigned'], np.nan)
+            df['mean_days_to_pay'] = np.where(df['paid'] > 0, df['days_to_pay_sum'] / df['paid'], np.nan)
+        return df
+
+    # --- SNAPSHOTS ---
+    def save(self, path=STATS_SNAPSHOT_PATH):
+        """Writes counters and open task state to an .npz file (atomically replaced)."""
+        task_ids = list(self.tasks)
+        state = np.array(list(self.tasks.values()), dtype=np.float64).reshape(-1, 4)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, agent_ids=self.agents.ids, task_ids=np.asarray(task_ids, dtype=str), task_state=state,
+                 meta=np.array([self.events, -1 if self.last_day is None else self.last_day], dtype=np.int64),
+                 **self.agents.columns)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=STATS_SNAPSHOT_PATH):
+        with np.load(path) as snap:
+            stats = cls(snap['agent_ids'])
+            for name in COUNTERS:
+                stats.agents.columns[name][:] = snap[name]
+            state = snap['task_state']
+            stats.tasks = {t: [int(s[0]), int(s[1]), float(s[2]), bool(s[3])]
+                           for t, s in zip(snap['task_ids'].tolist(), state)}
+            stats.events, last_day = (int(v) for v in snap['meta'])
+            stats.last_day = None if last_day < 0 else last_day
+        return stats
+
+def main():
+    agents = pd.read_csv(os.path.join(DATA_DIR, 'agents.csv'))
+    tasks = pd.read_csv(os.path.join(DATA_DIR, 'tasks.csv'))
+    interactions = pd.read_csv(os.path.join(DATA_DIR, 'interactions.csv'))
+
+    stats = AgentStats(agents['agent_id'])
+    start = time.perf_counter()
+    stats.replay_interactions(interactions, tasks)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {len(interactions)} interactions ({stats.events} events) in {elapsed:.2f}s "
+          f"({stats.events / elapsed:,.0f} events/s)")
+
+    stats.save()
+    restored = AgentStats.load()
+    assert restored.table().equals(stats.table())
+    print(f"Snapshot saved to {STATS_SNAPSHOT_PATH}")
+
+    print("\nTop agents by recovery rate:")
+    print(stats.table().sort_values('recovery_rate', ascending=False).head())
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,45 @@
 import pandas as pd
 import numpy as np
-from xgboost import XGBClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-from sklearn.preprocessing import LabelEncoder
+from xgboost import XGBClassifier, DMatrix
 import os
 import joblib
+import hashlib
+import heapq
+import time
+from collections import OrderedDict
+
+from registry import Registry
+from parallel_scoring import ParallelScorer
+from inference import ALLOCATOR_BOOSTER_PATH, ALLOCATOR_TREES_PATH, load_allocator_meta, save_allocator_meta
+from tree_compiler import compile_booster
+from drift_monitor import ALLOCATOR_REFERENCE_PATH, build_reference, save_reference
 
 # --- CONFIG ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
 
+# Feature columns split by the side of the (task, agent) pair they come from
+TASK_FEATURES = ['amount_due', 'days_overdue', 'risk_score', 'customer_segment_encoded']
+AGENT_FEATURES = ['tenure_months', 'skill_level_encoded']
+# Contribution vectors kept for allocate_bulk(explain=True), per model version
+EXPLANATION_CACHE_SIZE = 10000
+
 class SmartAllocator:
-    def __init__(self):
+    def __init__(self, cache=None, stats=None, monitor=None):
         self.model = XGBClassifier(use_label_encoder=False, eval_metric='logloss', random_state=42)
         self.label_encoders = {}
         self.feature_columns = None
+        # Optional ProbabilityCache shared between allocation runs
+        self.cache = cache
+        # Optional AgentStats: source of live workload, updated with each allocation
+        self.stats = stats
+        # Optional DriftMonitor fed with the inputs and scores of each allocation
+        self.monitor = monitor
+        self._booster_cache = (None, None, None)
+        # (model version, n_jobs, ParallelScorer) for allocate_bulk(n_jobs=...)
+        self._scorer = (None, None, None)
+        # (model version, LRU of contribution vectors by pair band codes)
+        self._explanations = (None, OrderedDict())
     
     def load_data(self):
         print("Loading data...")
@@ -24,8 +48,29 @@ class SmartAllocator:
         self.interactions = pd.read_csv(os.path.join(DATA_DIR, 'interactions.csv'))
         return self.agents, self.tasks, self.interactions
 
-    def train_engine(self):
-        print("Training Allocator Engine...")
+    def load_model(self):
+        """Loads the saved model and its encoders instead of training."""
+        from sklearn.preprocessing import LabelEncoder
+        if os.path.exists(ALLOCATOR_BOOSTER_PATH):
+            self.model = XGBClassifier()
+            self.model.load_model(ALLOCATOR_BOOSTER_PATH)
+        else:
+            self.model = joblib.load(os.path.join(SCRIPT_DIR, 'allocator_model.pkl'))
+        meta = load_allocator_meta()
+        self.feature_columns = meta['feature_columns']
+        for col, classes in meta['categories'].items():
+            le = LabelEncoder()
+            le.classes_ = np.array(classes, dtype=object)
+            self.label_encoders[col] = le
+        return self.model
+
+    def build_training_data(self):
+        """
+        Merged and encoded (X, y) for the allocator model. Fits the label
+        encoders and sets feature_columns.
+        """
+        from sklearn.preprocessing import LabelEncoder
+        
         # 1. Merge Data
         # Interactions + Tasks (on task_id) + Agents (on agent_id)
         df = self.interactions.merge(self.tasks, on='task_id').merge(self.agents, on='agent_id')
@@ -51,8 +96,16 @@ class SmartAllocator:
                     'skill_level_encoded', 'customer_segment_encoded']
         self.feature_columns = features
         
-        X = df[features]
-        y = df['is_success']
+        return df[features], df['is_success']
+
+    def train_engine(self):
+        # Training-only dependencies
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import accuracy_score
+        
+        print("Training Allocator Engine...")
+        X, y = self.build_training_data()
+        features = self.feature_columns
         
         # Train/Test Split
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -77,72 +130,442 @@ class SmartAllocator:
         
         # Save
         joblib.dump(self.model, os.path.join(SCRIPT_DIR, 'allocator_model.pkl'))
+        # Native booster + encodings for the inference runtime (inference.py)
+        self.model.get_booster().save_model(ALLOCATOR_BOOSTER_PATH)
+        compile_booster(self.model.get_booster()).save(ALLOCATOR_TREES_PATH)
+        save_allocator_meta(features, {col: le.classes_ for col, le in self.label_encoders.items()})
+        # Training distribution of inputs and scores, for drift monitoring
+        reference = {col: X[col].to_numpy() for col in features if not col.endswith('_encoded')}
+        for col, le in self.label_encoders.items():
+            reference[col] = le.classes_[X[f'{col}_encoded'].to_numpy()]
+        reference['success_prob'] = self.model.predict_proba(X_test)[:, 1]
+        save_reference(build_reference(reference, categorical=list(self.label_encoders)), ALLOCATOR_REFERENCE_PATH)
         return acc
 
-    def allocate_bulk(self, unassigned_tasks_df, available_agents_df, max_tasks_per_agent=50):
-        print(f"Allocating {len(unassigned_tasks_df)} tasks to {len(available_agents_df)} agents...")
-        
-        # Pre-process Inputs for Prediction
-        # We need to cross-join Tasks and Agents to score every pair
+    def _encode_categorical(self, source, col):
+        if isinstance(source, Registry):
+            # Translate the registry's category codes into the model's encoding
+            return self.label_encoders[col].transform(source.categories[col])[source.columns[col]]
+        return self.label_encoders[col].transform(source[col])
+
+    def _encode_tasks(self, tasks):
+        # Task-side columns of the feature vector (DataFrame or task Registry)
+        cols = tasks.columns if isinstance(tasks, Registry) else tasks
+        X = np.empty((len(tasks), len(TASK_FEATURES)), dtype=np.float64)
+        X[:, 0] = np.asarray(cols['amount_due'], dtype=np.float64)
+        X[:, 1] = np.asarray(cols['days_overdue'], dtype=np.float64)
+        X[:, 2] = np.asarray(cols['risk_score'], dtype=np.float64)
+        X[:, 3] = self._encode_categorical(tasks, 'customer_segment')
+        return X
+
+    def _encode_agents(self, agents):
+        # Agent-side columns of the feature vector (DataFrame or agent Registry)
+        cols = agents.columns if isinstance(agents, Registry) else agents
+        X = np.empty((len(agents), len(AGENT_FEATURES)), dtype=np.float64)
+        X[:, 0] = np.asarray(cols['tenure_months'], dtype=np.float64)
+        X[:, 1] = self._encode_categorical(agents, 'skill_level')
+        return X
+
+    def _monitor_features(self, X, columns):
+        # Encoded categoricals go back to their labels, as in the reference
+        for i, col in enumerate(columns):
+            if col.endswith('_encoded'):
+                name = col[:-len('_encoded')]
+                self.monitor.update(name, self.label_encoders[name].classes_[X[:, i].astype(np.int64)])
+            else:
+                self.monitor.update(col, X[:, i])
+
+    def _booster_info(self):
+        """
+        Per-model data derived from the trained trees, recomputed after retraining:
+        - split points: sorted split thresholds per feature. Two values that fall
+          between the same pair of thresholds take the same path through every
+          tree, so they get exactly the same prediction.
+        - model version: digest of the serialized booster, used to invalidate
+          cached probabilities.
+        """
+        booster = self.model.get_booster()
+        if self._booster_cache[0] is not booster:
+            trees = booster.trees_to_dataframe()
+            splits = trees[trees['Feature'] != 'Leaf']
+            points = {
+                col: np.unique(splits.loc[splits['Feature'] == col, 'Split'].to_numpy(dtype=np.float32))
+                for col in self.feature_columns
+            }
+            version = hashlib.sha1(bytes(booster.save_raw())).hexdigest()
+            self._booster_cache = (booster, points, version)
+        return self._booster_cache[1], self._booster_cache[2]
+
+    def _profiles(self, X, columns):
+        """
+        Groups rows of X into profiles that the model cannot tell apart.
+        Returns (representative rows, band codes of each profile, profile index of each row).
+        """
+        points, _ = self._booster_info()
+        bands = np.empty(X.shape, dtype=np.int64)
+        for i, col in enumerate(columns):
+            # XGBoost compares float32(x) < threshold
+            bands[:, i] = np.searchsorted(points[col], X[:, i].astype(np.float32), side='right')
+            # Missing values follow the default branch, keep them apart
+            bands[np.isnan(X[:, i]), i] = -1
+        _, first, inverse = np.unique(bands, axis=0, return_index=True, return_inverse=True)
+        return X[first], bands[first], inverse.reshape(-1)
+
+    def profile_tasks(self, tasks):
+        """
+        Task profiles for repeated scoring (e.g. allocation_simulator).
+        tasks: DataFrame or task Registry, or an already encoded
+        (n, len(TASK_FEATURES)) array.
+        Returns (representative rows, band codes of each profile, profile index of each task).
+        """
+        X = tasks if isinstance(tasks, np.ndarray) else self._encode_tasks(tasks)
+        return self._profiles(X, TASK_FEATURES)
+
+    def profile_agents(self, agents):
+        """Agent buckets, as profile_tasks: (representative rows, band codes, bucket of each agent)."""
+        return self._profiles(self._encode_agents(agents), AGENT_FEATURES)
+
+    def band_counts(self, columns):
+        """Number of distinct band codes per column (-1 for missing up to len(split points))."""
+        points, _ = self._booster_info()
+        return [len(points[col]) + 2 for col in columns]
+
+    def _pair_frame(self, task_rows, agent_rows):
+        pairs = pd.DataFrame(task_rows, columns=TASK_FEATURES)
+        for i, col in enumerate(AGENT_FEATURES):
+            pairs[col] = agent_rows[:, i]
+        return pairs[self.feature_columns]
+
+    def _predict_pairs(self, task_rows, agent_rows):
+        return self.model.predict_proba(self._pair_frame(task_rows, agent_rows))[:, 1]
+
+    def score_profiles(self, task_profiles, agent_profiles, task_keys, agent_keys):
+        """
+        Scores every (task profile, agent profile) combination with one model call.
+        With a cache attached, only combinations whose band codes were not seen
+        before by this model version reach the model.
+        Returns a (n_task_profiles, n_agent_profiles) probability matrix.
+        """
+        n_t, n_a = len(task_profiles), len(agent_profiles)
+        t_idx = np.repeat(np.arange(n_t), n_a)
+        a_idx = np.tile(np.arange(n_a), n_t)
         
-        # 1. Create Prediction Dataset (Cartesian Product)
-        # To avoid massive memory usage, we can do this in batches or just be careful.
-        # For 100 tasks * 50 agents = 5000 rows (trivial)
+        if self.cache is None:
+            probs = self._predict_pairs(task_profiles[t_idx], agent_profiles[a_idx])
+            return probs.reshape(n_t, n_a)
         
-        # Add a common key for cross join
-        unassigned_tasks_df['key'] = 1
-        available_agents_df['key'] = 1
+        _, version = self._booster_info()
+        self.cache.bind(version)
+        t_keys = [tuple(k) for k in task_keys.tolist()]
+        a_keys = [tuple(k) for k in agent_keys.tolist()]
+        keys = [t_keys[t] + a_keys[a] for t, a in zip(t_idx.tolist(), a_idx.tolist())]
         
-        pairs = pd.merge(unassigned_tasks_df, available_agents_df, on='key').drop('key', axis=1)
+        probs, miss = self.cache.get_many(keys)
+        if miss.any():
+            probs[miss] = self._predict_pairs(task_profiles[t_idx[miss]], agent_profiles[a_idx[miss]])
+            self.cache.put_many([keys[i] for i in np.flatnonzero(miss)], probs[miss])
+        return probs.reshape(n_t, n_a)
+
+    def _explain(self, task_profiles, agent_profiles, task_keys, agent_keys, pair_tasks, pair_agents, top_n):
+        """
+        Top `top_n` feature contributions (log-odds, largest magnitude first)
+        for each selected (task profile, agent profile) pair.
+
+        Contributions come from pred_contribs with approx_contribs=True:
+        per-path (Saabas) attribution, not SHAP. It sums to the same margin
+        per row and is about 100x cheaper than exact TreeSHAP here. Like
+        probabilities, contributions only depend on which side of each split a
+        row falls, so they are cached by the pair's band codes, and every
+        distinct uncached pair is computed in a single pred_contribs call.
+        """
+        _, version = self._booster_info()
+        if self._explanations[0] != version:
+            self._explanations = (version, OrderedDict())
+        cache = self._explanations[1]
+
+        n_a = len(agent_profiles)
+        pairs, inverse = np.unique(pair_tasks * n_a + pair_agents, return_inverse=True)
+        t_keys = task_keys[pairs // n_a].tolist()
+        a_keys = agent_keys[pairs % n_a].tolist()
+        keys = [tuple(t) + tuple(a) for t, a in zip(t_keys, a_keys)]
+
+        values = np.empty((len(keys), len(self.feature_columns)), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            if key in cache:
+                cache.move_to_end(key)
+                values[i] = cache[key]
+            else:
+                missing.append(i)
+        if missing:
+            rows = pairs[missing]
+            frame = self._pair_frame(task_profiles[rows // n_a], agent_profiles[rows % n_a])
+            # Last column is the bias term
+            values[missing] = self.model.get_booster().predict(
+                DMatrix(frame), pred_contribs=True, approx_contribs=True)[:, :-1]
+            for i in missing:
+                cache[keys[i]] = values[i]
+        while len(cache) > EXPLANATION_CACHE_SIZE:
+            cache.popitem(last=False)
+
+        names = [col.replace('_encoded', '') for col in self.feature_columns]
+        order = np.argsort(-np.abs(values), axis=1)[:, :top_n]
+        picked = np.round(np.take_along_axis(values, order, axis=1), 4).tolist()
+        top = [[(names[j], v) for j, v in zip(o, p)] for o, p in zip(order.tolist(), picked)]
+        return [top[i] for i in inverse.reshape(-1).tolist()]
+
+    def _parallel_scorer(self, n_jobs):
+        _, version = self._booster_info()
+        if self._scorer[:2] != (version, n_jobs):
+            self.close()
+            layout = [('task', TASK_FEATURES.index(c)) if c in TASK_FEATURES else ('agent', AGENT_FEATURES.index(c))
+                      for c in self.feature_columns]
+            scorer = ParallelScorer(self.model.get_booster().save_raw(), layout, n_jobs=n_jobs)
+            self._scorer = (version, n_jobs, scorer)
+        return self._scorer[2]
+
+    def close(self):
+        """Shuts down the worker pool used by parallel scoring, if any."""
+        if self._scorer[2] is not None:
+            self._scorer[2].close()
+        self._scorer = (None, None, None)
+
+    def allocate_bulk(self, unassigned_tasks_df, available_agents_df, max_tasks_per_agent=50, top_buckets=5, n_jobs=None,
+                      explain=False, explain_top=3):
+        """
+        Greedy allocation of tasks to agents by predicted success probability.
+
+        Agents with the same skill_level and the same tenure band (the interval
+        between two tenure split points of the trees) produce identical model
+        outputs, so they are grouped into buckets. Tasks are collapsed the same
+        way, and the model is evaluated once per (task profile, bucket) instead
+        of once per (task, agent) pair.
+        Only the `top_buckets` best buckets per task are kept as candidates; the
+        result is the same as scoring every pair (see greedy_assign).
         
-        # Encode Features for Pairs
-        pairs['skill_level_encoded'] = self.label_encoders['skill_level'].transform(pairs['skill_level'])
-        pairs['customer_segment_encoded'] = self.label_encoders['customer_segment'].transform(pairs['customer_segment'])
+        Tasks and agents can be DataFrames or registries (see registry.py). With
+        an agent registry, the new assignments are added to its 'workload'
+        array in place (also when the workloads come from self.stats).
         
-        X_predict = pairs[self.feature_columns]
+        With an AgentStats attached (self.stats, see agent_stats.py), workloads
+        come from its materialized counters instead of the agents input, the
+        new assignments are recorded into it, and the result carries each
+        agent's recovery rate.
+
+        With a DriftMonitor attached (self.monitor, see drift_monitor.py), the
+        task and agent features and the scores of all task x agent pairs are
+        added to its sketches.
+
+        n_jobs > 1 scores the profile pairs on a pool of worker processes (see
+        parallel_scoring.py) that only return the top buckets of each task.
+        This mode does not use the probability cache, and does not feed
+        scores to the drift monitor (only the top buckets come back).
         
-        # Predict Probabilities
-        probs = self.model.predict_proba(X_predict)[:, 1]
-        pairs['predicted_success_prob'] = probs
+        explain=True adds a 'top_features' column: the `explain_top` features
+        that pushed each chosen assignment's score up or down the most, as
+        (feature, log-odds contribution) pairs. Only the selected pairs are
+        explained; the time this adds is printed.
+        """
+        start = time.perf_counter()
+        print(f"Allocating {len(unassigned_tasks_df)} tasks to {len(available_agents_df)} agents...")
+        if isinstance(unassigned_tasks_df, Registry):
+            task_ids = unassigned_tasks_df.ids
+        else:
+            task_ids = unassigned_tasks_df['task_id'].to_numpy()
+        if isinstance(available_agents_df, Registry):
+            agent_ids = available_agents_df.ids
+        else:
+            agent_ids = available_agents_df['agent_id'].to_numpy()
         
-        # 2. Greedy Allocation Loop
-        assignments = []
-        agent_current_load = available_agents_df.set_index('agent_id')['current_workload'].to_dict()
-        task_assigned = set()
+        # 1. Candidate Generation
+        # Collapse identical tasks and identical agents into profiles
+        X_tasks = self._encode_tasks(unassigned_tasks_df)
+        X_agents = self._encode_agents(available_agents_df)
+        if self.monitor is not None:
+            self._monitor_features(X_tasks, TASK_FEATURES)
+            self._monitor_features(X_agents, AGENT_FEATURES)
+        if self.cache is not None:
+            X_tasks = self.cache.quantize_columns(X_tasks, TASK_FEATURES)
+        task_profiles, task_keys, task_profile_idx = self._profiles(X_tasks, TASK_FEATURES)
+        agent_profiles, agent_keys, agent_bucket = self._profiles(X_agents, AGENT_FEATURES)
         
-        # Sort all pairs by Probability DESC
-        pairs_sorted = pairs.sort_values(by='predicted_success_prob', ascending=False)
+        print(f"Scoring {len(task_profiles) * len(agent_profiles)} profile pairs "
+              f"(instead of {len(task_ids) * len(agent_ids)} task x agent pairs).")
         
-        for idx, row in pairs_sorted.iterrows():
-            t_id = row['task_id']
-            a_id = row['agent_id']
-            
-            # If task already assigned, skip
-            if t_id in task_assigned:
-                continue
-            
-            # If agent full, skip
-            if agent_current_load.get(a_id, 0) >= max_tasks_per_agent:
-                continue
-            
-            # Assign
-            assignments.append({
-                'task_id': t_id,
-                'assigned_agent_id': a_id,
-                'predicted_success_prob': row['predicted_success_prob']
-            })
+        if n_jobs is not None and n_jobs > 1:
+            scorer = self._parallel_scorer(n_jobs)
             
-            task_assigned.add(t_id)
-            agent_current_load[a_id] = agent_current_load.get(a_id, 0) + 1
-            
-            # Optimization: If all tasks assigned, break early
-            if len(task_assigned) == len(unassigned_tasks_df):
-                break
-                
-        results_df = pd.DataFrame(assignments)
+            def candidates(k):
+                idx, probs = scorer.score_top_k(task_profiles, agent_profiles, k)
+                return idx[task_profile_idx], probs[task_profile_idx].astype(np.float64)
+        else:
+            profile_probs = self.score_profiles(task_profiles, agent_profiles, task_keys, agent_keys)
+            if self.cache is not None:
+                print(f"Score cache hit rate: {self.cache.hit_rate:.2%} ({len(self.cache)} entries)")
+            if self.monitor is not None:
+                # Scores of every task x agent pair, one weighted entry per profile pair
+                weights = np.outer(np.bincount(task_profile_idx, minlength=len(task_profiles)),
+                                   np.bincount(agent_bucket, minlength=len(agent_profiles)))
+                self.monitor.update('success_prob', profile_probs.ravel(), weights.ravel())
+            candidates = matrix_candidates(profile_probs[task_profile_idx])
+        
+        # 2. Greedy Allocation over buckets
+        if self.stats is not None:
+            loads = self.stats.workload(agent_ids)
+        elif isinstance(available_agents_df, Registry):
+            loads = available_agents_df.columns['workload']
+        elif 'current_workload' in available_agents_df.columns:
+            loads = available_agents_df['current_workload'].fillna(0).to_numpy(dtype=np.int64, copy=True)
+        else:
+            loads = np.zeros(len(agent_ids), dtype=np.int64)
+        
+        assigned = greedy_over_candidates(
+            candidates, len(agent_profiles), agent_bucket, loads,
+            max_tasks_per_agent, top_buckets=top_buckets)
+        if self.stats is not None and isinstance(available_agents_df, Registry):
+            # greedy_over_candidates updated the stats' copy: keep the registry in step
+            available_agents_df.columns['workload'] += np.bincount(
+                assigned[1], minlength=len(agent_ids)).astype(available_agents_df.columns['workload'].dtype)
+        
+        results_df = pd.DataFrame({
+            'task_id': task_ids[assigned[0]],
+            'assigned_agent_id': agent_ids[assigned[1]],
+            'predicted_success_prob': assigned[2]
+        })
+        if self.stats is not None:
+            task_cols = unassigned_tasks_df.columns if isinstance(unassigned_tasks_df, Registry) else unassigned_tasks_df
+            risk = np.asarray(task_cols['risk_score'], dtype=np.float64)[assigned[0]]
+            self.stats.record_assignments(results_df['task_id'], results_df['assigned_agent_id'], risk)
+            results_df['agent_recovery_rate'] = self.stats.table(results_df['assigned_agent_id'])['recovery_rate'].to_numpy()
+        if explain:
+            elapsed = time.perf_counter() - start
+            results_df['top_features'] = self._explain(
+                task_profiles, agent_profiles, task_keys, agent_keys,
+                task_profile_idx[assigned[0]], agent_bucket[assigned[1]], explain_top)
+            overhead = time.perf_counter() - start - elapsed
+            n_explained = int(results_df['top_features'].notna().sum())
+            print(f"Explained {n_explained}/{len(results_df)} assignments in {overhead * 1000:.1f} ms "
+                  f"({overhead / elapsed:.1%} of allocation time).")
         print(f"Allocated {len(results_df)} tasks.")
         return results_df
 
+def greedy_assign(task_bucket_probs, agent_bucket, loads, max_tasks_per_agent, top_buckets=None):
+    """
+    Greedy assignment over agent buckets.
+
+    task_bucket_probs: (n_tasks, n_buckets) success probability of each task in each bucket
+    agent_bucket: bucket index of each agent
+    loads: current workload of each agent (updated in place)
+    top_buckets: if set, only the best `top_buckets` buckets per task are candidates
+
+    Returns (task_idx, agent_idx, prob) arrays in assignment order.
+    """
+    return greedy_over_candidates(
+        matrix_candidates(task_bucket_probs), task_bucket_probs.shape[1],
+        agent_bucket, loads, max_tasks_per_agent, top_buckets)
+
+def matrix_candidates(task_bucket_probs):
+    """candidates(k) callback (see greedy_over_candidates) over a dense probability matrix."""
+    n_buckets = task_bucket_probs.shape[1]
+    
+    def candidates(k):
+        if k < n_buckets:
+            cand = np.argpartition(-task_bucket_probs, k - 1, axis=1)[:, :k]
+        else:
+            cand = np.broadcast_to(np.arange(n_buckets), task_bucket_probs.shape)
+        return cand, np.take_along_axis(task_bucket_probs, cand, axis=1)
+    return candidates
+
+def greedy_over_candidates(candidates, n_buckets, agent_bucket, loads, max_tasks_per_agent, top_buckets=None):
+    """
+    Greedy assignment where the candidate buckets of each task come from a callback.
+
+    candidates(k) -> (bucket_idx, probs), both (n_tasks, k): the best k buckets
+    of every task (any order) and their probabilities; k == n_buckets means all.
+
+    Pairs are taken in descending probability order; a task goes to the least
+    loaded agent of the bucket that still has spare capacity. Pruning is exact:
+    a pruned pair could only have been taken by a task whose candidates were
+    all rejected while some capacity was left. If no task ran out of
+    candidates that way (every task was placed, or capacity ran out first),
+    the unpruned pairs would all have been skipped anyway. Otherwise the
+    allocation is redone with more candidates, up to every bucket.
+    """
+    k = n_buckets if top_buckets is None else min(top_buckets, n_buckets)
+    initial_loads = loads.copy()
+    
+    while True:
+        cand, cand_probs = candidates(k)
+        result, exhausted = _greedy(cand, cand_probs, agent_bucket, loads, max_tasks_per_agent, n_buckets)
+        if k >= n_buckets or not exhausted:
+            return result
+        # Some task ran out of candidates, so a pruned pair could have changed
+        # the outcome. Redo the allocation with 4x as many candidates.
+        loads[:] = initial_loads
+        k = min(4 * k, n_buckets)
+
+def _greedy(cand, cand_probs, agent_bucket, loads, max_tasks_per_agent, n_buckets):
+    """
+    Returns ((task_idx, agent_idx, prob), exhausted); exhausted is True if a
+    task had every candidate rejected while capacity was still left.
+    """
+    n_tasks, k = cand.shape
+    cand_tasks = np.repeat(np.arange(n_tasks), k)
+    cand_buckets = cand.reshape(-1)
+    cand_probs = cand_probs.reshape(-1)
+    order = np.argsort(-cand_probs, kind='stable')
+    
+    # Agents of each bucket in a heap of (load, agent): the top is the least
+    # loaded one (lowest index on ties), and spare capacity per bucket
+    heaps = [[] for _ in range(n_buckets)]
+    spare = [0] * n_buckets
+    for a, (b, load) in enumerate(zip(agent_bucket.tolist(), loads.tolist())):
+        heaps[b].append((load, a))
+        spare[b] += max(max_tasks_per_agent - load, 0)
+    for h in heaps:
+        heapq.heapify(h)
+    remaining = sum(spare)
+    
+    task_done = [False] * n_tasks
+    rejected = [0] * n_tasks
+    exhausted = False
+    out_tasks, out_agents, out_probs = [], [], []
+    
+    # Plain Python values in the loop: scalar NumPy indexing dominates otherwise
+    for t, b, p in zip(cand_tasks[order].tolist(), cand_buckets[order].tolist(), cand_probs[order].tolist()):
+        # Every agent is full: nothing else can be assigned
+        if remaining <= 0:
+            break
+        
+        # If task already assigned, skip
+        if task_done[t]:
+            continue
+        # Every agent in the bucket is full: try the task's next candidate
+        if spare[b] <= 0:
+            rejected[t] += 1
+            if rejected[t] == k:
+                exhausted = True
+            continue
+        
+        # Identical agents: give it to the least loaded one
+        load, a = heaps[b][0]
+        heapq.heapreplace(heaps[b], (load + 1, a))
+        
+        task_done[t] = True
+        spare[b] -= 1
+        remaining -= 1
+        out_tasks.append(t)
+        out_agents.append(a)
+        out_probs.append(p)
+        
+        # Optimization: If all tasks assigned, break early
+        if len(out_tasks) == n_tasks:
+            break
+    
+    out_agents = np.array(out_agents, dtype=np.int64)
+    loads += np.bincount(out_agents, minlength=len(loads)).astype(loads.dtype)
+    return (np.array(out_tasks, dtype=np.int64), out_agents, np.array(out_probs, dtype=np.float64)), exhausted
+
 def main():
     allocator = SmartAllocator()
     
@@ -0,0 +1,182 @@
+import numpy as np
+import asyncio
+import time
+from collections import deque
+
+from train_agent_model import build_feature_matrix
+
+class BatchingRecommender:
+    """
+    Asyncio front end for per-case agent recommendations.
+
+    Concurrent recommend() calls are queued for at most `max_wait_ms`, merged
+    into one feature matrix (up to `max_batch_size` requests) and scored with a
+    single model call, then each caller gets its own result back. Under load
+    this replaces one predict_proba per case with one per batch.
+
+    The model call runs in the default executor so the event loop keeps
+    accepting requests while a batch is being scored.
+
+    Usage:
+        async with BatchingRecommender(model, feature_columns) as rec:
+            best = await rec.recommend(task_data, available_agents_list)
+    """
+
+    def __init__(self, model, feature_columns, max_batch_size=64, max_wait_ms=5.0, latency_window=10000):
+        self.model = model
+        self.feature_columns = feature_columns
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = None
+        self._worker = None
+        # Requests taken off the queue and not answered yet
+        self._batch = []
+        # Per-request latency (enqueue -> result) in ms, most recent requests only
+        self._latencies = deque(maxlen=latency_window)
+        self.batches = 0
+        self.requests = 0
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the worker; callers still waiting (queued or in the current batch) get CancelledError."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            pending = self._batch
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            for _, _, future, _ in pending:
+                future.cancel()
+            self._batch = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def recommend(self, task_data, available_agents_list):
+        """Same contract as train_agent_model.recommend_best_agent."""
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((task_data, available_agents_list, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        # Block for the first request, then fill the batch until it is full
+        # or the oldest request has waited max_wait_ms
+        batch = self._batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, batch):
+        """
+        One result per request. If the merged batch fails (e.g. a task missing
+        a feature), its requests are scored one by one so only the bad ones
+        fail: their result is the exception instead.
+        """
+        requests = [(task, agents) for task, agents, _, _ in batch]
+        try:
+            return self._score_requests(requests)
+        except Exception:
+            if len(requests) == 1:
+                raise
+        results = []
+        for request in requests:
+            try:
+                results.extend(self._score_requests([request]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _score_requests(self, requests):
+        X, offsets = build_feature_matrix(requests, self.feature_columns)
+        probs = self.model.predict_proba(X)[:, 1] if len(X) else np.empty(0)
+
+        results = []
+        for i, (_, agents) in enumerate(requests):
+            if not agents:
+                results.append(None)
+                continue
+            p = probs[offsets[i]:offsets[i + 1]]
+            best = int(np.argmax(p))
+            results.append({'agent_id': agents[best]['agent_id'], 'success_probability': p[best]})
+        return results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                results = await loop.run_in_executor(None, self._score, batch)
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            for (_, _, future, enqueued), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+                    self._latencies.append((now - enqueued) * 1000.0)
+            self.batches += 1
+            self.requests += len(batch)
+            self._batch = []
+
+    def latency_stats(self):
+        """p50/p99 request latency (ms) over the recent window, plus batching counters."""
+        if not self._latencies:
+            return {'count': 0, 'p50_ms': None, 'p99_ms': None, 'batches': self.batches, 'mean_batch_size': None}
+        lat = np.fromiter(self._latencies, dtype=np.float64)
+        return {
+            'count': len(lat),
+            'p50_ms': float(np.percentile(lat, 50)),
+            'p99_ms': float(np.percentile(lat, 99)),
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches,
+        }
+
+async def _demo(model, features, agents_df, tasks_df, concurrency=200):
+    agents = agents_df.head(10).to_dict('records')
+    tasks = tasks_df.sample(concurrency, random_state=42).to_dict('records')
+    async with BatchingRecommender(model, features) as rec:
+        start = time.perf_counter()
+        await asyncio.gather(*(rec.recommend(t, agents) for t in tasks))
+        elapsed = time.perf_counter() - start
+        stats = rec.latency_stats()
+    print(f"{concurrency} concurrent requests in {elapsed * 1000:.1f} ms "
+          f"({stats['batches']} batches, mean size {stats['mean_batch_size']:.1f})")
+    print(f"Latency p50: {stats['p50_ms']:.2f} ms, p99: {stats['p99_ms']:.2f} ms")
+
+def main():
+    from train_agent_model import load_data, preprocess_data, train_model
+    agents_df, tasks_df, interactions_df = load_data()
+    X, y, _ = preprocess_data(agents_df, tasks_df, interactions_df)
+    model, features = train_model(X, y)
+    asyncio.run(_demo(model, features, agents_df, tasks_df))
+
+if __name__ == "__main__":
+    main()
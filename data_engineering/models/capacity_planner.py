@@ -0,0 +1,316 @@
+"""
+Capacity planning from the volume forecast and the agent performance model.
+
+For each day of the forecast horizon, the planner estimates how many cases
+are open, how many agents are needed to hold all of them at
+max_tasks_per_agent, and which max_tasks_per_agent the current roster needs to
+hold them. It also finds the headcount that clears the waiting backlog by
+clear_by_day and keeps it clear to the end of the horizon.
+
+Case handling is fluid, as in allocation_simulator, but depends on the
+predicted recovery rate r of the agents: a held case is paid with probability
+r / mean_pay_days per day and otherwise written off or returned with
+probability (1 - r) / mean_handle_days. Paid cases leave faster, so a roster
+with better rates drains the backlog faster and needs fewer agents. Cases
+beyond capacity wait.
+
+Scenarios are what-if variations (volume, caps, handling time, shift
+availability, new hires...). All scenarios are evaluated together as arrays
+of shape (scenarios, days), so thousands of them take well under a second.
+
+    forecast = load_volume_forecast(days=30)
+    roster = load_roster()
+    daily, caps = plan_capacity(forecast, roster, scenario_grid(volume_multiplier=[1.0, 1.2]))
+"""
+import numpy as np
+import pandas as pd
+import itertools
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+# --- CONFIG ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
+VOLUME_MODEL_PATH = os.path.join(SCRIPT_DIR, 'volume_model.pkl')
+PERFORMANCE_MODEL_PATH = os.path.join(SCRIPT_DIR, 'agent_performance_model.pkl')
+PLAN_PATH = os.path.join(DATA_DIR, 'capacity_plan.json')
+
+# Baseline scenario; every scenario overrides some of these
+DEFAULT_SCENARIO = {
+    'volume_multiplier': 1.0,     # scales the forecast volume
+    'max_tasks_per_agent': 50,    # allocator cap (SmartAllocator.allocate_bulk)
+    'mean_handle_days': 15.0,     # unpaid cases, as in allocation_simulator
+    'mean_pay_days': 5.0,         # paid cases (agent_stats mean_days_to_pay is ~4 on the generated data)
+    'rate_multiplier': 1.0,       # scales predicted recovery rates
+    'initial_backlog': 0.0,       # open cases on day 0
+    'shift_availability': {},     # {shift: fraction of its agents working}, default 1
+    'extra_agents': {},           # {shift: hires}, at that shift's mean predicted rate
+    'clear_by_day': None,         # day index the backlog must be cleared by, default the last day
+}
+
+# --- INPUTS ---
+def load_volume_forecast(days=30, model=None):
+    """Daily predicted task volume after the last entry_date in tasks.csv (train_volume_model)."""
+    import joblib
+    from train_volume_model import load_data, preprocess_data, forecast_future
+    model = model or joblib.load(VOLUME_MODEL_PATH)
+    history = preprocess_data(load_data())
+    future = forecast_future(model, history['entry_date'].max(), days=days)
+    return future[['date', 'predicted_volume']].reset_index(drop=True)
+
+def load_roster(agents_df=None, interactions_df=None, model=None):
+    """
+    agents.csv with each agent's predicted next-week recovery rate
+    (train_forecasting_model), from the agent's latest week of interactions.
+    Agents without history get the mean rate.
+    """
+    import joblib
+    from train_forecasting_model import load_data, aggregate_weekly_metrics, feature_engineering
+    if agents_df is None or interactions_df is None:
+        agents_df, interactions_df = load_data()
+    model = model or joblib.load(PERFORMANCE_MODEL_PATH)
+
+    weekly = aggregate_weekly_metrics(interactions_df.copy(), agents_df, drop_unlabeled=False)
+    latest = weekly.groupby('agent_id').tail(1)
+    X, _ = feature_engineering(latest.copy())
+    # Dummy columns of skill levels missing from this slice
+    X = X.reindex(columns=model.feature_names_in_, fill_value=0)
+    rates = pd.Series(np.clip(model.predict(X), 0.0, 1.0), index=latest['agent_id'].to_numpy())
+
+    roster = agents_df.copy()
+    roster['predicted_rate'] = roster['agent_id'].map(rates)
+    roster['predicted_rate'] = roster['predicted_rate'].fillna(rates.mean() if len(rates) else 0.0)
+    return roster
+
+def open_case_count(tasks_df, interactions_df):
+    """Tasks without a 'Paid' outcome yet: the backlog to start planning from."""
+    paid = interactions_df.loc[interactions_df['outcome'] == 'Paid', 'task_id'].unique()
+    return int((~tasks_df['task_id'].isin(paid)).sum())
+
+# --- SCENARIOS ---
+def scenario_grid(**axes):
+    """
+    Every combination of the given values, e.g.
+    scenario_grid(volume_multiplier=[1.0, 1.2], max_tasks_per_agent=[40, 50])
+    gives 4 scenarios. Values of dict-valued fields are dicts too.
+    """
+    names = list(axes)
+    scenarios = []
+    for values in itertools.product(*(axes[n] for n in names)):
+        scenario = dict(zip(names, values))
+        scenario['name'] = ', '.join(f"{n}={_label(v)}" for n, v in scenario.items())
+        scenarios.append(scenario)
+    return scenarios
+
+def _label(value):
+    if isinstance(value, dict):
+        return '/'.join(f"{k}:{v}" for k, v in value.items()) or 'none'
+    return str(value)
+
+def _scenario_arrays(scenarios, shifts):
+    S, K = len(scenarios), len(shifts)
+    full = [{**DEFAULT_SCENARIO, **s} for s in scenarios]
+    arrays = {key: np.array([s[key] for s in full], dtype=np.float64)
+              for key in ('volume_multiplier', 'max_tasks_per_agent', 'mean_handle_days',
+                          'mean_pay_days', 'rate_multiplier', 'initial_backlog')}
+    arrays['clear_by_day'] = np.array([-1 if s['clear_by_day'] is None else s['clear_by_day'] for s in full],
+                                      dtype=np.int64)
+    arrays['availability'] = np.ones((S, K))
+    arrays['extra_agents'] = np.zeros((S, K))
+    for i, s in enumerate(full):
+        for k, shift in enumerate(shifts):
+            arrays['availability'][i, k] = s['shift_availability'].get(shift, 1.0)
+            arrays['extra_agents'][i, k] = s['extra_agents'].get(shift, 0)
+    return arrays
+
+# --- PLANNING ---
+def _backlog(arrivals, initial_backlog, capacity, drain):
+    """Fluid backlog: (open_cases, held_cases), each of shape (S, H)."""
+    S, H = arrivals.shape
+    open_cases = np.empty((S, H))
+    held = np.empty((S, H))
+    carried = initial_backlog.copy()
+    for d in range(H):
+        open_cases[:, d] = carried + arrivals[:, d]
+        held[:, d] = np.minimum(open_cases[:, d], capacity)
+        carried = open_cases[:, d] - held[:, d] * drain
+    return open_cases, held
+
+def _headcount_to_clear(arrivals, initial_backlog, cap, drain, clear_by_day):
+    """
+    Smallest headcount per scenario with no waiting cases from clear_by_day
+    to the end of the horizon, by bisection over all scenarios at once.
+    Holding every case that could ever be open always clears, so that is the
+    upper bound.
+    """
+    S, H = arrivals.shape
+    clear_by_day = np.where((clear_by_day < 0) | (clear_by_day >= H), H - 1, clear_by_day)
+    must_clear = np.arange(H)[None, :] >= clear_by_day[:, None]
+    lo = np.zeros(S)
+    hi = np.ceil((initial_backlog + arrivals.sum(axis=1)) / cap)
+    while (hi - lo > 0).any():
+        mid = np.floor((lo + hi) / 2)
+        open_cases, held = _backlog(arrivals, initial_backlog, mid * cap, drain)
+        clear = ~((open_cases - held > 0.5) & must_clear).any(axis=1)
+        hi = np.where(clear, mid, hi)
+        lo = np.where(clear, lo, mid + 1)
+    return hi
+
+def plan_capacity(forecast, roster, scenarios=None):
+    """
+    forecast: DataFrame with 'date' and 'predicted_volume' (load_volume_forecast)
+    roster: DataFrame with 'agent_id', 'shift' and 'predicted_rate' (load_roster)
+    scenarios: list of dicts overriding DEFAULT_SCENARIO (optional 'name')
+
+    Returns (daily, agent_caps):
+    - daily: one row per scenario and day with arrivals, open_cases,
+      held_cases (within capacity), waiting_cases (beyond capacity),
+      closed_cases, expected_recoveries, required_headcount (agents needed to
+      hold every open case at max_tasks_per_agent, also per shift),
+      required_cap (cap needed with the scenario's roster) and
+      headcount_to_clear (agents at the roster's mean predicted rate needed
+      to clear the waiting backlog by clear_by_day, also per shift)
+    - agent_caps: one row per scenario and agent, the cap each agent needs on
+      the scenario's peak day if open cases are shared in proportion to
+      predicted recovery rates
+    """
+    scenarios = scenarios or [{'name': 'baseline'}]
+    shifts = sorted(roster['shift'].astype(str).unique())
+    shift_idx = np.searchsorted(shifts, roster['shift'].astype(str).to_numpy())
+    rates = roster['predicted_rate'].to_numpy(dtype=np.float64)
+    counts = np.bincount(shift_idx, minlength=len(shifts)).astype(np.float64)
+    rate_sums = np.bincount(shift_idx, weights=rates, minlength=len(shifts))
+    mean_rates = np.divide(rate_sums, counts, out=np.zeros_like(rate_sums), where=counts > 0)
+
+    p = _scenario_arrays(scenarios, shifts)
+    cap = p['max_tasks_per_agent']
+    # (S, K) effective headcount and summed rates per shift
+    headcount = p['availability'] * counts + p['extra_agents']
+    rate_weight = p['availability'] * rate_sums + p['extra_agents'] * mean_rates
+    total_headcount = headcount.sum(axis=1)
+    mean_rate = np.divide(rate_weight.sum(axis=1), total_headcount,
+                          out=np.zeros(len(scenarios)), where=total_headcount > 0) * p['rate_multiplier']
+    mean_rate = np.clip(mean_rate, 0.0, 1.0)
+
+    volume = forecast['predicted_volume'].to_numpy(dtype=np.float64)
+    S, H = len(scenarios), len(volume)
+    arrivals = p['volume_multiplier'][:, None] * volume[None, :]
+    capacity = cap * total_headcount
+    # Daily probability that a held case is paid, and that it closes at all
+    pay = mean_rate / p['mean_pay_days']
+    drain = pay + (1.0 - mean_rate) / p['mean_handle_days']
+
+    open_cases, held = _backlog(arrivals, p['initial_backlog'], capacity, drain)
+    closed = held * drain[:, None]
+    to_clear = (_headcount_to_clear(arrivals, p['initial_backlog'], cap, drain, p['clear_by_day'])
+                if H else np.zeros(S))
+
+    required_headcount = np.ceil(open_cases / cap[:, None] - 1e-9)
+    share = np.divide(headcount, total_headcount[:, None], out=np.zeros_like(headcount),
+                      where=total_headcount[:, None] > 0)
+    per_shift = np.ceil(open_cases[:, :, None] * share[:, None, :] / cap[:, None, None] - 1e-9)
+    to_clear_per_shift = np.ceil(to_clear[:, None] * share - 1e-9)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        required_cap = np.where(total_headcount[:, None] > 0,
+                                np.ceil(open_cases / total_headcount[:, None] - 1e-9), np.inf)
+
+    names = [s.get('name', f"scenario_{i}") for i, s in enumerate(scenarios)]
+    daily = pd.DataFrame({
+        'scenario': np.repeat(names, H),
+        'date': np.tile(pd.to_datetime(forecast['date']).to_numpy(), S),
+        'arrivals': arrivals.ravel(),
+        'open_cases': open_cases.ravel(),
+        'held_cases': held.ravel(),
+        'waiting_cases': (open_cases - held).ravel(),
+        'closed_cases': closed.ravel(),
+        'expected_recoveries': (held * pay[:, None]).ravel(),
+        'available_headcount': np.repeat(total_headcount, H),
+        'required_headcount': required_headcount.ravel().astype(np.int64),
+        'required_cap': required_cap.ravel(),
+        'headcount_to_clear': np.repeat(to_clear, H).astype(np.int64),
+    })
+    for k, shift in enumerate(shifts):
+        daily[f'required_headcount_{shift.lower()}'] = per_shift[:, :, k].ravel().astype(np.int64)
+        daily[f'headcount_to_clear_{shift.lower()}'] = np.repeat(to_clear_per_shift[:, k], H).astype(np.int64)
+
+    # Peak-day share of open cases per agent, by predicted rate on available shifts
+    weights = rates[None, :] * p['availability'][:, shift_idx]
+    total_weight = rate_weight.sum(axis=1)
+    peak = open_cases.max(axis=1) if H else np.zeros(S)
+    agent_cap = np.ceil(peak[:, None] * np.divide(weights, total_weight[:, None], out=np.zeros_like(weights),
+                                                  where=total_weight[:, None] > 0) - 1e-9)
+    agent_caps = pd.DataFrame({
+        'scenario': np.repeat(names, len(roster)),
+        'agent_id': np.tile(roster['agent_id'].to_numpy(), S),
+        'shift': np.tile(roster['shift'].to_numpy(), S),
+        'predicted_rate': np.tile(rates, S),
+        'cap': agent_cap.ravel().astype(np.int64),
+    })
+    return daily, agent_caps
+
+def summarize_plan(daily):
+    """One row per scenario: peak needs, headcount to clear, final backlog and total expected recoveries."""
+    grouped = daily.groupby('scenario', sort=False)
+    return pd.DataFrame({
+        'peak_open_cases': grouped['open_cases'].max(),
+        'peak_required_headcount': grouped['required_headcount'].max(),
+        'available_headcount': grouped['available_headcount'].first(),
+        'headcount_to_clear': grouped['headcount_to_clear'].first(),
+        'peak_required_cap': grouped['required_cap'].max(),
+        'days_short': grouped['waiting_cases'].agg(lambda w: int((w > 0.5).sum())),
+        'final_waiting_cases': grouped['waiting_cases'].last(),
+        'expected_recoveries': grouped['expected_recoveries'].sum(),
+    })
+
+def save_plan(daily, agent_caps, scenarios, path=PLAN_PATH):
+    """Writes the plan as JSON for the analytics dashboard: per scenario, its settings, summary and daily rows."""
+    summary = summarize_plan(daily)
+    daily = daily.assign(date=daily['date'].dt.strftime('%Y-%m-%d'))
+    out = []
+    for i, scenario in enumerate(scenarios):
+        name = scenario.get('name', f"scenario_{i}")
+        out.append({
+            'name': name,
+            'settings': {**DEFAULT_SCENARIO, **{k: v for k, v in scenario.items() if k != 'name'}},
+            'summary': json.loads(summary.loc[name].to_json()),
+            'daily': json.loads(daily[daily['scenario'] == name].drop(columns='scenario').to_json(orient='records')),
+            'agent_caps': json.loads(agent_caps.loc[agent_caps['scenario'] == name, ['agent_id', 'shift', 'cap']]
+                                     .to_json(orient='records')),
+        })
+    with open(path, 'w') as f:
+        json.dump({'generated_at': datetime.now(timezone.utc).isoformat(), 'scenarios': out}, f)
+
+def main():
+    forecast = load_volume_forecast(days=30)
+    roster = load_roster()
+    tasks = pd.read_csv(os.path.join(DATA_DIR, 'tasks.csv'))
+    interactions = pd.read_csv(os.path.join(DATA_DIR, 'interactions.csv'))
+    backlog = open_case_count(tasks, interactions)
+    print(f"{len(roster)} agents, {backlog} open cases, "
+          f"{forecast['predicted_volume'].sum():.0f} new cases forecast over {len(forecast)} days")
+
+    scenarios = [
+        {'name': 'baseline', 'initial_backlog': backlog},
+        {'name': 'volume +30%', 'initial_backlog': backlog, 'volume_multiplier': 1.3},
+        {'name': 'evening shift at 50%', 'initial_backlog': backlog, 'shift_availability': {'Evening': 0.5}},
+        {'name': 'cap 40 + 5 morning hires', 'initial_backlog': backlog, 'max_tasks_per_agent': 40,
+         'extra_agents': {'Morning': 5}},
+    ]
+    daily, caps = plan_capacity(forecast, roster, scenarios)
+    print(summarize_plan(daily))
+    save_plan(daily, caps, scenarios)
+    print(f"Plan saved to {PLAN_PATH}")
+
+    # Batch what-if timing
+    grid = scenario_grid(volume_multiplier=np.linspace(0.8, 1.5, 15), max_tasks_per_agent=range(30, 80, 5),
+                         mean_handle_days=[10, 15, 20, 30], rate_multiplier=[0.8, 1.0, 1.2], initial_backlog=[0, backlog // 2, backlog],
+                         shift_availability=[{}, {'Morning': 0.8}, {'Evening': 0.8}])
+    start = time.perf_counter()
+    daily, caps = plan_capacity(forecast, roster, grid)
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(grid)} scenarios x {len(forecast)} days planned in {elapsed * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
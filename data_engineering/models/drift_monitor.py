@@ -0,0 +1,298 @@
+"""
+Drift monitoring for model inputs and scores.
+
+At training time, train_engine / train_agent_model / train_sla_risk_model
+save a reference snapshot next to the model (*.reference.json): one sketch
+per feature and per score, filled with the training data (scores: held-out
+predictions). In production a DriftMonitor keeps sketches of
+the same shape, fed inline by allocation (SmartAllocator(monitor=...)) and
+ingestion (IngestionPipeline(monitor=...)), and compares them with the
+reference by PSI and KS.
+
+Sketches use constant memory (one counter per bin or category, whatever the
+number of rows seen) and merge by adding counters, so workers can each keep
+their own and the parent combines them with merge().
+
+    monitor = DriftMonitor.load(ALLOCATOR_REFERENCE_PATH)
+    monitor.update_frame(cases_df)
+    print(monitor.report())
+"""
+import numpy as np
+import pandas as pd
+import json
+import os
+
+# --- CONFIG ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
+ALLOCATOR_REFERENCE_PATH = os.path.join(SCRIPT_DIR, 'allocator_model.reference.json')
+AGENT_REFERENCE_PATH = os.path.join(SCRIPT_DIR, 'agent_model.reference.json')
+SLA_REFERENCE_PATH = os.path.join(SCRIPT_DIR, 'sla_model.reference.json')
+
+DEFAULT_BINS = 20
+# Usual PSI reading: < 0.1 stable, 0.1 - 0.25 moderate shift, > 0.25 major shift
+PSI_MODERATE = 0.1
+PSI_MAJOR = 0.25
+# Floor for empty bins, keeps PSI finite
+PSI_EPSILON = 1e-4
+
+class NumericSketch:
+    """
+    Histogram over fixed bin edges: bin 0 is x < edges[0], bin i is
+    edges[i-1] <= x < edges[i], the last bin is x >= edges[-1]. NaNs are
+    counted apart. The reference uses its training quantiles as edges, so each
+    bin starts with about the same share of rows, and live sketches reuse the
+    reference edges so the two can be compared bin by bin.
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.float64)
+        self.missing = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_values(cls, values, n_bins=DEFAULT_BINS):
+        """Sketch of `values` with edges at their n_bins-quantiles."""
+        values = np.asarray(values, dtype=np.float64)
+        finite = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(finite, np.linspace(0, 1, n_bins + 1)[1:-1])) if len(finite) else []
+        sketch = cls(edges)
+        sketch.update(values)
+        return sketch
+
+    def empty_like(self):
+        return NumericSketch(self.edges)
+
+    @property
+    def count(self):
+        return float(self.counts.sum())
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        weights = None if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+        nan = np.isnan(values)
+        if nan.any():
+            self.missing += float(nan.sum() if weights is None else weights[nan].sum())
+            values = values[~nan]
+            weights = None if weights is None else weights[~nan]
+        if len(values):
+            bins = np.searchsorted(self.edges, values, side='right')
+            self.counts += np.bincount(bins, weights=weights, minlength=len(self.counts))
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge sketches with different bin edges")
+        self.counts += other.counts
+        self.missing += other.missing
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile, interpolating linearly inside its bin."""
+        total = self.count
+        if total == 0:
+            return np.nan
+        cum = np.cumsum(self.counts)
+        i = int(np.searchsorted(cum, q * total, side='left'))
+        i = min(i, len(self.counts) - 1)
+        lower = self.edges[i - 1] if i > 0 else self.min
+        upper = self.edges[i] if i < len(self.edges) else self.max
+        lower, upper = max(lower, self.min), min(upper, self.max)
+        before = cum[i - 1] if i > 0 else 0.0
+        frac = (q * total - before) / self.counts[i] if self.counts[i] else 0.0
+        return float(lower + (upper - lower) * frac)
+
+    def to_dict(self):
+        return {'type': 'numeric', 'edges': self.edges.tolist(), 'counts': self.counts.tolist(),
+                'missing': self.missing, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(d['edges'])
+        sketch.counts[:] = d['counts']
+        sketch.missing, sketch.min, sketch.max = d['missing'], d['min'], d['max']
+        return sketch
+
+class CategoricalSketch:
+    """Counts per known category, plus one counter for values outside `categories`."""
+
+    def __init__(self, categories):
+        self.categories = [str(c) for c in categories]
+        self._codes = {c: i for i, c in enumerate(self.categories)}
+        # Last slot: unseen categories
+        self.counts = np.zeros(len(self.categories) + 1, dtype=np.float64)
+        self.missing = 0.0
+
+    @classmethod
+    def from_values(cls, values):
+        values = pd.Series(values).dropna().astype(str)
+        sketch = cls(sorted(values.unique()))
+        sketch.update(values)
+        return sketch
+
+    def empty_like(self):
+        return CategoricalSketch(self.categories)
+
+    @property
+    def count(self):
+        return float(self.counts.sum())
+
+    def update(self, values, weights=None):
+        values = pd.Series(np.asarray(values, dtype=object).ravel())
+        weights = None if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+        nan = values.isna().to_numpy()
+        if nan.any():
+            self.missing += float(nan.sum() if weights is None else weights[nan].sum())
+            values = values[~nan]
+            weights = None if weights is None else weights[~nan]
+        # One dict lookup per distinct value
+        uniques, inverse = np.unique(values.astype(str).to_numpy(), return_inverse=True)
+        other = len(self.categories)
+        codes = np.array([self._codes.get(u, other) for u in uniques.tolist()], dtype=np.int64)
+        self.counts += np.bincount(codes[inverse.reshape(-1)], weights=weights, minlength=len(self.counts))
+
+    def merge(self, other):
+        if self.categories != other.categories:
+            raise ValueError("Cannot merge sketches with different categories")
+        self.counts += other.counts
+        self.missing += other.missing
+        return self
+
+    def to_dict(self):
+        return {'type': 'categorical', 'categories': self.categories, 'counts': self.counts.tolist(),
+                'missing': self.missing}
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(d['categories'])
+        sketch.counts[:] = d['counts']
+        sketch.missing = d['missing']
+        return sketch
+
+SKETCH_TYPES = {'numeric': NumericSketch, 'categorical': CategoricalSketch}
+
+def psi(expected_counts, actual_counts):
+    """Population Stability Index between two count vectors over the same bins."""
+    p = np.maximum(expected_counts / max(expected_counts.sum(), 1.0), PSI_EPSILON)
+    q = np.maximum(actual_counts / max(actual_counts.sum(), 1.0), PSI_EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+def ks(expected_counts, actual_counts):
+    """Max CDF distance evaluated at the bin edges (a lower bound of the exact KS statistic)."""
+    p = np.cumsum(expected_counts) / max(expected_counts.sum(), 1.0)
+    q = np.cumsum(actual_counts) / max(actual_counts.sum(), 1.0)
+    return float(np.max(np.abs(p - q)))
+
+# --- REFERENCE ---
+def build_reference(columns, categorical=(), n_bins=DEFAULT_BINS):
+    """
+    Reference sketches of the training data.
+    columns: {name: values} (or a DataFrame); names in `categorical` get
+    category counts, every other column a quantile histogram.
+    """
+    features = {}
+    for name in columns:
+        values = columns[name]
+        if name in categorical:
+            features[name] = CategoricalSketch.from_values(values)
+        else:
+            features[name] = NumericSketch.from_values(values, n_bins)
+    return features
+
+def save_reference(features, path):
+    with open(path, 'w') as f:
+        json.dump({'features': {name: s.to_dict() for name, s in features.items()}}, f)
+
+def load_reference(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found, retrain the model to create it")
+    with open(path) as f:
+        data = json.load(f)
+    return {name: SKETCH_TYPES[d['type']].from_dict(d) for name, d in data['features'].items()}
+
+# --- MONITOR ---
+class DriftMonitor:
+    """
+    Live sketches for every feature / score of a reference snapshot.
+
+    update() and update_frame() ignore names the reference does not have, so
+    one monitor can be fed by callers that see different subsets of the
+    features (e.g. ingestion has no agent features or allocator scores).
+    """
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.sketches = {name: ref.empty_like() for name, ref in reference.items()}
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_reference(path))
+
+    def update(self, name, values, weights=None):
+        sketch = self.sketches.get(name)
+        if sketch is not None:
+            sketch.update(values, weights)
+
+    def update_frame(self, frame, weights=None):
+        """Updates every monitored column present in a DataFrame (or dict of arrays)."""
+        for name, sketch in self.sketches.items():
+            if name in frame:
+                sketch.update(frame[name], weights)
+
+    def merge(self, other):
+        """Adds another monitor's counts (e.g. from a worker process) into this one."""
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+        return self
+
+    def reset(self):
+        self.sketches = {name: ref.empty_like() for name, ref in self.reference.items()}
+
+    def report(self):
+        """
+        PSI, KS and a stable / moderate / major verdict per feature, indexed by
+        feature name. KS needs ordered bins, so it is NaN for categorical
+        features.
+        """
+        rows = []
+        for name, sketch in self.sketches.items():
+            ref = self.reference[name]
+            if sketch.count == 0:
+                rows.append({'feature': name, 'count': 0, 'psi': np.nan, 'ks': np.nan, 'status': 'no data'})
+                continue
+            value = psi(ref.counts, sketch.counts)
+            status = 'major' if value > PSI_MAJOR else 'moderate' if value > PSI_MODERATE else 'stable'
+            rows.append({'feature': name, 'count': int(sketch.count), 'psi': value,
+                         'ks': ks(ref.counts, sketch.counts) if isinstance(ref, NumericSketch) else np.nan,
+                         'status': status})
+        return pd.DataFrame(rows).set_index('feature')
+
+def main():
+    tasks = pd.read_csv(os.path.join(DATA_DIR, 'tasks.csv'))
+    if not os.path.exists(ALLOCATOR_REFERENCE_PATH):
+        print(f"{ALLOCATOR_REFERENCE_PATH} not found, run ai_allocator.py first")
+        return
+
+    # Two "workers" each see half of the cases; the parent merges their sketches
+    half = len(tasks) // 2
+    workers = [DriftMonitor.load(ALLOCATOR_REFERENCE_PATH) for _ in range(2)]
+    workers[0].update_frame(tasks.iloc[:half])
+    workers[1].update_frame(tasks.iloc[half:])
+    monitor = workers[0].merge(workers[1])
+    print("Current tasks vs allocator training data:")
+    print(monitor.report())
+
+    # Simulated shift: older cases with lower scores
+    shifted = tasks.assign(days_overdue=tasks['days_overdue'] * 2, risk_score=tasks['risk_score'] * 0.9)
+    monitor.reset()
+    monitor.update_frame(shifted)
+    print("\nShifted tasks:")
+    print(monitor.report())
+
+if __name__ == "__main__":
+    main()
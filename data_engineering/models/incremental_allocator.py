@@ -0,0 +1,209 @@
+import pandas as pd
+import numpy as np
+
+from ai_allocator import SmartAllocator
+
+AGENT_COLUMNS = {'skill_level': object, 'tenure_months': np.int64, 'current_workload': np.int64}
+TASK_COLUMNS = {'amount_due': np.float64, 'days_overdue': np.int64, 'risk_score': np.int64, 'customer_segment': object}
+
+class _SlotTable:
+    """
+    Rows keyed by id, stored in column arrays with fixed dtypes. Adding or
+    removing n rows is O(n) (amortized: the arrays double when full) and the
+    slots of removed rows are reused.
+    """
+
+    def __init__(self, index_name, dtypes, capacity=16):
+        self.index_name = index_name
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        self.ids = np.empty(capacity, dtype=object)
+        self.live = np.zeros(capacity, dtype=bool)
+        # id -> slot of the live rows
+        self.slots = {}
+        self._free = []
+        self._end = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _new_slot(self):
+        if self._free:
+            return self._free.pop()
+        if self._end == len(self.live):
+            self.columns = {name: np.concatenate([arr, np.zeros_like(arr)]) for name, arr in self.columns.items()}
+            self.ids = np.concatenate([self.ids, np.empty(len(self.ids), dtype=object)])
+            self.live = np.concatenate([self.live, np.zeros_like(self.live)])
+        self._end += 1
+        return self._end - 1
+
+    def put(self, ids, values):
+        """Inserts or overwrites rows. values: {column: array aligned with ids}."""
+        slots = np.empty(len(ids), dtype=np.int64)
+        for i, key in enumerate(ids):
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self._new_slot()
+                self.slots[key] = slot
+                self.ids[slot] = key
+                self.live[slot] = True
+            slots[i] = slot
+        for name, vals in values.items():
+            self.columns[name][slots] = vals
+        return slots
+
+    def remove(self, ids):
+        for key in ids:
+            slot = self.slots.pop(key, None)
+            if slot is not None:
+                self.live[slot] = False
+                self.ids[slot] = None
+                self._free.append(slot)
+
+    def slots_of(self, ids):
+        return np.array([self.slots[key] for key in ids], dtype=np.int64)
+
+    def frame(self, slots=None):
+        """The given rows (default: all live rows) as a DataFrame indexed by id."""
+        slots = np.flatnonzero(self.live) if slots is None else slots
+        return pd.DataFrame({name: arr[slots] for name, arr in self.columns.items()},
+                            index=pd.Index(self.ids[slots], name=self.index_name))
+
+class IncrementalAllocator:
+    """
+    Keeps the current assignment state between allocation runs.
+
+    Intraday, new cases arrive in small batches and agents go on or off shift.
+    Instead of re-running allocate_bulk over every open task, only the delta is
+    allocated: new tasks and tasks whose agent left are offered to the agents
+    that still have spare capacity. Existing assignments are never reshuffled.
+
+    Agents and open tasks live in slot tables and every agent keeps the set of
+    tasks it holds, so adding, removing or completing n items costs O(n)
+    whatever the size of the state.
+    """
+
+    def __init__(self, allocator, max_tasks_per_agent=50, top_buckets=5):
+        self.allocator = allocator
+        self.max_tasks_per_agent = max_tasks_per_agent
+        self.top_buckets = top_buckets
+
+        # Agents on shift with their live workload, and open tasks
+        self._agents = _SlotTable('agent_id', AGENT_COLUMNS)
+        self._tasks = _SlotTable('task_id', TASK_COLUMNS)
+        # task_id -> agent_id for assigned tasks
+        self.assignments = {}
+        # agent_id -> {task_id: None} of the tasks it holds (reverse of assignments)
+        self.tasks_of = {}
+        # task_ids waiting for an agent, in arrival order
+        self.pending = {}
+
+    @property
+    def agents(self):
+        """Agents on shift, indexed by agent_id, with their live workload (built on access)."""
+        return self._agents.frame()
+
+    @property
+    def tasks(self):
+        """Open tasks, indexed by task_id (built on access)."""
+        return self._tasks.frame()
+
+    def add_agents(self, agents_df):
+        """Agents going on shift. A 'current_workload' column is honoured if present."""
+        ids = agents_df['agent_id'].tolist()
+        if 'current_workload' in agents_df.columns:
+            workload = agents_df['current_workload'].fillna(0).to_numpy(dtype=np.int64)
+        else:
+            # Count what they already hold in this allocator (0 for new agents)
+            workload = np.array([len(self.tasks_of.get(a_id, ())) for a_id in ids], dtype=np.int64)
+        self._agents.put(ids, {'skill_level': agents_df['skill_level'].to_numpy(dtype=object),
+                               'tenure_months': agents_df['tenure_months'].to_numpy(dtype=np.int64),
+                               'current_workload': workload})
+
+    def remove_agents(self, agent_ids):
+        """Agents going off shift. Their open tasks are re-offered on the next allocate()."""
+        agent_ids = list(agent_ids)
+        self._agents.remove(agent_ids)
+        orphaned = []
+        for a_id in agent_ids:
+            for t_id in self.tasks_of.pop(a_id, {}):
+                del self.assignments[t_id]
+                self.pending[t_id] = None
+                orphaned.append(t_id)
+        return orphaned
+
+    def add_tasks(self, tasks_df):
+        """New cases. They wait in the pending queue until allocate() is called."""
+        ids = tasks_df['task_id'].tolist()
+        self._tasks.put(ids, {col: tasks_df[col].to_numpy(dtype=dtype) for col, dtype in TASK_COLUMNS.items()})
+        for t_id in ids:
+            if t_id not in self.assignments:
+                self.pending[t_id] = None
+
+    def complete_tasks(self, task_ids):
+        """Closed cases. Frees capacity on the agent that held them."""
+        task_ids = list(task_ids)
+        workload = self._agents.columns['current_workload']
+        for t_id in task_ids:
+            a_id = self.assignments.pop(t_id, None)
+            self.pending.pop(t_id, None)
+            if a_id is None:
+                continue
+            held = self.tasks_of[a_id]
+            del held[t_id]
+            if not held:
+                del self.tasks_of[a_id]
+            slot = self._agents.slots.get(a_id)
+            if slot is not None:
+                workload[slot] -= 1
+        self._tasks.remove(task_ids)
+
+    def allocate(self):
+        """
+        Allocates pending tasks to agents with spare capacity.
+        Returns the new assignments only; tasks that did not fit stay pending.
+        """
+        if not self.pending:
+            return pd.DataFrame(columns=['task_id', 'assigned_agent_id', 'predicted_success_prob'])
+
+        pending_df = self._tasks.frame(self._tasks.slots_of(self.pending)).reset_index()
+        agents = self._agents
+        spare = agents.frame(np.flatnonzero(agents.live & (agents.columns['current_workload'] < self.max_tasks_per_agent)))
+        if spare.empty:
+            return pd.DataFrame(columns=['task_id', 'assigned_agent_id', 'predicted_success_prob'])
+
+        new_assignments = self.allocator.allocate_bulk(
+            pending_df, spare.reset_index(), max_tasks_per_agent=self.max_tasks_per_agent,
+            top_buckets=self.top_buckets)
+
+        # Commit the delta into the live state
+        for t_id, a_id in zip(new_assignments['task_id'], new_assignments['assigned_agent_id']):
+            self.assignments[t_id] = a_id
+            self.tasks_of.setdefault(a_id, {})[t_id] = None
+            del self.pending[t_id]
+        np.add.at(agents.columns['current_workload'], agents.slots_of(new_assignments['assigned_agent_id']), 1)
+        return new_assignments
+
+def main():
+    allocator = SmartAllocator()
+    allocator.load_data()
+    allocator.train_engine()
+
+    inc = IncrementalAllocator(allocator)
+
+    # Start of day: everyone on shift, first batch of cases
+    inc.add_agents(allocator.agents)
+    inc.add_tasks(allocator.tasks.sample(500, random_state=1))
+    first = inc.allocate()
+    print(f"Morning run: {len(first)} tasks allocated")
+
+    # Intraday: a trickle of new cases and the morning shift leaving
+    inc.add_tasks(allocator.tasks.sample(20, random_state=2))
+    leaving = allocator.agents.loc[allocator.agents['shift'] == 'Morning', 'agent_id']
+    orphaned = inc.remove_agents(leaving)
+    print(f"{len(leaving)} agents off shift, {len(orphaned)} tasks to re-offer")
+    delta = inc.allocate()
+    print(f"Incremental run: {len(delta)} tasks allocated, {len(inc.pending)} still pending")
+    print(delta.head())
+
+if __name__ == "__main__":
+    main()
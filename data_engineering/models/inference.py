@@ -0,0 +1,189 @@
+"""
+Inference-only runtime for the allocator and SLA risk models.
+
+Importing this module costs only NumPy. The allocator is scored with the
+compiled trees (tree_compiler.CompiledTrees) when they have been saved, so
+XGBoost is only imported as a fallback, and nothing from the training stack
+(pandas, sklearn.model_selection / metrics, matplotlib, faker) is needed. This
+is the entry point for serverless scoring, where the import and load time is
+paid on every cold start.
+
+Artifacts (written by the training scripts):
+- allocator_trees/           compiled trees, NumPy arrays (memory-mapped on load)
+- allocator_model.ubj        native XGBoost booster
+- allocator_model.meta.json  feature columns and category encodings
+- sla_risk_model.json        scaler and logistic regression coefficients
+"""
+import numpy as np
+import json
+import os
+import subprocess
+import sys
+import time
+
+from tree_compiler import CompiledTrees
+
+# --- CONFIG ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ALLOCATOR_TREES_PATH = os.path.join(SCRIPT_DIR, 'allocator_trees')
+ALLOCATOR_BOOSTER_PATH = os.path.join(SCRIPT_DIR, 'allocator_model.ubj')
+ALLOCATOR_PICKLE_PATH = os.path.join(SCRIPT_DIR, 'allocator_model.pkl')
+ALLOCATOR_META_PATH = os.path.join(SCRIPT_DIR, 'allocator_model.meta.json')
+SLA_MODEL_PATH = os.path.join(SCRIPT_DIR, 'sla_risk_model.json')
+
+# Encoding used by ai_allocator.train_engine (LabelEncoder sorts the classes),
+# for models saved before the metadata file existed
+DEFAULT_ALLOCATOR_META = {
+    'feature_columns': ['amount_due', 'days_overdue', 'risk_score', 'tenure_months',
+                        'skill_level_encoded', 'customer_segment_encoded'],
+    'categories': {
+        'skill_level': ['Junior', 'Senior', 'Specialist'],
+        'customer_segment': ['Corporate', 'Retail', 'SME'],
+    },
+}
+
+def save_allocator_meta(feature_columns, categories, path=ALLOCATOR_META_PATH):
+    with open(path, 'w') as f:
+        json.dump({'feature_columns': list(feature_columns),
+                   'categories': {k: [str(c) for c in v] for k, v in categories.items()}}, f, indent=2)
+
+def load_allocator_meta(meta_path=ALLOCATOR_META_PATH):
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return json.load(f)
+    return DEFAULT_ALLOCATOR_META
+
+def load_allocator(booster_path=ALLOCATOR_BOOSTER_PATH, meta_path=ALLOCATOR_META_PATH,
+                   trees_path=ALLOCATOR_TREES_PATH):
+    """
+    Returns (booster, meta). The booster is the compiled trees when they have
+    been saved (no XGBoost import), else the native XGBoost booster, else the
+    pickled XGBClassifier's booster. predict_proba accepts any of them.
+    """
+    if trees_path and os.path.exists(os.path.join(trees_path, 'meta.json')):
+        return CompiledTrees.load(trees_path), load_allocator_meta(meta_path)
+    import xgboost as xgb
+    if os.path.exists(booster_path):
+        booster = xgb.Booster(model_file=booster_path)
+    else:
+        import joblib
+        booster = joblib.load(ALLOCATOR_PICKLE_PATH).get_booster()
+    return booster, load_allocator_meta(meta_path)
+
+def encode_categories(values, categories):
+    """Label-encodes values against a sorted category list. Unknown values raise ValueError."""
+    categories = np.asarray(categories, dtype=str)
+    values = np.asarray(values, dtype=str)
+    codes = np.searchsorted(categories, values)
+    codes = np.minimum(codes, len(categories) - 1)
+    unknown = categories[codes] != values
+    if unknown.any():
+        raise ValueError(f"Unknown categories: {sorted(set(values[unknown].tolist()))}")
+    return codes
+
+def encode_pairs(tasks, agents, meta):
+    """
+    Feature matrix for (task, agent) pairs, row i pairs tasks[i] with agents[i].
+
+    tasks: mapping of column -> array ('amount_due', 'days_overdue', 'risk_score', 'customer_segment')
+    agents: mapping of column -> array ('tenure_months', 'skill_level')
+    """
+    columns = {**tasks, **agents}
+    n = len(columns['amount_due'])
+    X = np.empty((n, len(meta['feature_columns'])), dtype=np.float32)
+    for j, col in enumerate(meta['feature_columns']):
+        if col.endswith('_encoded'):
+            name = col[:-len('_encoded')]
+            X[:, j] = encode_categories(columns[name], meta['categories'][name])
+        else:
+            X[:, j] = np.asarray(columns[col], dtype=np.float32)
+    return X
+
+def predict_proba(booster, X):
+    """P(success) for each row of an encoded feature matrix."""
+    if len(X) == 0:
+        return np.empty(0, dtype=np.float32)
+    if isinstance(booster, CompiledTrees):
+        return booster.predict_proba(X)
+    return booster.inplace_predict(X)
+
+def score_task_agents(booster, meta, task, agents):
+    """
+    Scores one task against a list of candidate agents.
+    task: dict of task fields; agents: list of dicts with 'tenure_months', 'skill_level'
+    """
+    n = len(agents)
+    tasks = {k: [task[k]] * n for k in ('amount_due', 'days_overdue', 'risk_score', 'customer_segment')}
+    agent_cols = {k: [a[k] for a in agents] for k in ('tenure_months', 'skill_level')}
+    return predict_proba(booster, encode_pairs(tasks, agent_cols, meta))
+
+# --- SLA RISK ---
+def save_sla_model(scaler, model, features, path=SLA_MODEL_PATH):
+    with open(path, 'w') as f:
+        json.dump({
+            'features': list(features),
+            'mean': scaler.mean_.tolist(),
+            'scale': scaler.scale_.tolist(),
+            'coef': model.coef_[0].tolist(),
+            'intercept': float(model.intercept_[0]),
+        }, f, indent=2)
+
+def load_sla_model(path=SLA_MODEL_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found, run train_sla_risk_model.py first")
+    with open(path) as f:
+        params = json.load(f)
+    for key in ('mean', 'scale', 'coef'):
+        params[key] = np.asarray(params[key], dtype=np.float64)
+    return params
+
+def sla_features(days_overdue, total_attempts, is_paid):
+    """Binary rule features used by train_sla_risk_model, as an (n, 4) matrix."""
+    overdue_90 = (np.asarray(days_overdue) > 90).astype(np.float64)
+    attempts_5 = (np.asarray(total_attempts) > 5).astype(np.float64)
+    not_paid = (np.asarray(is_paid) == 0).astype(np.float64)
+    return np.column_stack([overdue_90, attempts_5, not_paid, overdue_90 * attempts_5 * not_paid])
+
+def predict_sla_risk(params, X):
+    """P(high_risk_flag) for each row of sla_features()."""
+    z = ((X - params['mean']) / params['scale']) @ params['coef'] + params['intercept']
+    return 1.0 / (1.0 + np.exp(-z))
+
+# --- COLD START ---
+_COLD_START_CASES = {
+    'inference import only': "import inference\n",
+    'inference runtime': (
+        "import inference\n"
+        "b, m = inference.load_allocator()\n"
+        "inference.score_task_agents(b, m, {'amount_due': 500, 'days_overdue': 60, 'risk_score': 600, "
+        "'customer_segment': 'Retail'}, [{'tenure_months': 30, 'skill_level': 'Senior'}])\n"
+    ),
+    'ai_allocator (training module)': (
+        "import joblib, ai_allocator\n"
+        "joblib.load(ai_allocator.os.path.join(ai_allocator.SCRIPT_DIR, 'allocator_model.pkl'))\n"
+    ),
+}
+
+def measure_cold_start(repeats=3):
+    """
+    Wall time of a fresh interpreter importing and loading each path, best of
+    `repeats` runs. Includes interpreter start-up, like a serverless cold start.
+    """
+    results = {}
+    for name, code in _COLD_START_CASES.items():
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+    return results
+
+def main():
+    print("Measuring cold start (best of 3)...")
+    for name, seconds in measure_cold_start().items():
+        print(f"{name:<32} {seconds * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
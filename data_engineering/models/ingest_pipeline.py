@@ -0,0 +1,309 @@
+"""
+Bulk case ingestion: stream a CSV / Parquet file of cases in chunks, score
+each chunk with the SLA risk model and the allocator encodings, and write the
+enriched rows through a pluggable sink.
+
+Python counterpart of `/api/ingest` in backend/server.js, for uploads that do
+not fit in one request body or one Firestore batch (500 writes).
+
+    sink = SQLiteSink('cases.db')
+    stats = IngestionPipeline(sink, batch_size=500, max_concurrency=4).run('cases.csv')
+"""
+import numpy as np
+import pandas as pd
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from inference import (encode_categories, load_allocator_meta, load_sla_model,
+                       predict_sla_risk, sla_features)
+from drift_monitor import ALLOCATOR_REFERENCE_PATH, SLA_REFERENCE_PATH, DriftMonitor, load_reference
+
+# --- CONFIG ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
+
+# Upload headers (sample.csv, the /api/ingest JSON) -> dataset column names
+COLUMN_ALIASES = {
+    'Customer Name': 'customer_name', 'customerName': 'customer_name',
+    'Amount': 'amount_due', 'amount': 'amount_due',
+    'Days Overdue': 'days_overdue', 'daysOverdue': 'days_overdue',
+    'Risk Score': 'risk_score', 'riskScore': 'risk_score',
+    'Segment': 'customer_segment', 'segment': 'customer_segment',
+    'Phone': 'phone', 'Email': 'email',
+}
+SLA_HIGH_RISK_THRESHOLD = 0.5
+# Scored columns -> field names of the Firestore `cases` documents that
+# /api/ingest writes and the server / dashboard read (src/types/schema.js)
+SERVER_FIELDS = {
+    'customer_name': 'customerName', 'amount_due': 'amount', 'days_overdue': 'daysOverdue',
+    'ingest_risk_score': 'riskScore', 'ingest_segment': 'segment',
+    'assigned_agency': 'assignedAgency', 'created_at': 'createdAt', 'updated_at': 'updatedAt',
+}
+# /api/ingest marks cases above this heuristic risk score as 'High Priority'
+HIGH_PRIORITY_RISK = 80
+
+def heuristic_risk(amount, days_overdue):
+    """
+    The risk score (0-99) and segment that /api/ingest in backend/server.js
+    assigns to new cases, vectorized.
+    """
+    amount = np.asarray(amount, dtype=np.float64)
+    days_overdue = np.asarray(days_overdue)
+    risk = (30 + 20 * (days_overdue > 30) + 20 * (days_overdue > 60) + 25 * (days_overdue > 90)
+            + 10 * (amount > 10000))
+    risk = np.minimum(99, risk).astype(np.int64)
+    segment = np.where(amount < 500, 'Low Balance', np.where(risk > HIGH_PRIORITY_RISK, 'High Priority', 'Standard'))
+    return risk, segment
+
+def read_chunks(path, chunk_size=10000):
+    """Yields DataFrames of at most chunk_size rows, without loading the whole file."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+class CaseScorer:
+    """
+    Vectorized per-chunk scoring with the trained artifacts (inference.py):
+    - ingest_risk_score / ingest_segment: the /api/ingest heuristic
+      (heuristic_risk), which is what the server and dashboard use
+    - sla_risk: P(high_risk_flag) from the SLA risk model
+    - customer_segment_encoded: allocator encoding, -1 for unseen segments
+
+    Missing total_attempts / is_paid (new cases) count as 0. The SLA model's
+    target needs more than 5 attempts, so for new cases it gives the same
+    near-zero sla_risk to every row; it only becomes informative once cases
+    have interactions.
+    """
+
+    def __init__(self, sla_params=None, allocator_meta=None):
+        self.sla_params = sla_params if sla_params is not None else load_sla_model()
+        self.segments = (allocator_meta or load_allocator_meta())['categories']['customer_segment']
+
+    def score(self, chunk):
+        df = chunk.rename(columns=COLUMN_ALIASES)
+        n = len(df)
+
+        def numeric(col, dtype):
+            if col not in df.columns:
+                return np.zeros(n, dtype=dtype)
+            return pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=dtype)
+
+        df['amount_due'] = numeric('amount_due', np.float64)
+        df['days_overdue'] = numeric('days_overdue', np.int64)
+        if 'risk_score' in df.columns:
+            df['risk_score'] = pd.to_numeric(df['risk_score'], errors='coerce')
+        df['ingest_risk_score'], df['ingest_segment'] = heuristic_risk(df['amount_due'], df['days_overdue'])
+        X = sla_features(df['days_overdue'].to_numpy(), numeric('total_attempts', np.int64),
+                         numeric('is_paid', np.int64))
+        df['sla_risk'] = predict_sla_risk(self.sla_params, X)
+        df['sla_high_risk'] = (df['sla_risk'] >= SLA_HIGH_RISK_THRESHOLD).astype(np.int8)
+
+        if 'customer_segment' in df.columns:
+            segments = df['customer_segment'].fillna('').astype(str).to_numpy()
+            known = np.isin(segments, self.segments)
+            codes = np.full(n, -1, dtype=np.int64)
+            if known.any():
+                codes[known] = encode_categories(segments[known], self.segments)
+            df['customer_segment_encoded'] = codes
+        else:
+            df['customer_segment_encoded'] = -1
+
+        now = datetime.now(timezone.utc).isoformat()
+        df['status'] = 'New'
+        df['assigned_agency'] = 'Unassigned'
+        df['created_at'] = now
+        df['updated_at'] = now
+        return df
+
+# --- SINKS ---
+class Sink:
+    """
+    Destination for scored rows. write_batch() gets a DataFrame of at most
+    max_batch_size rows and may be called from several threads at once.
+    """
+    max_batch_size = None
+
+    def write_batch(self, df):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class SQLiteSink(Sink):
+    """Appends to a SQLite table (created from the first batch). SQLite serializes writers."""
+
+    def __init__(self, path, table='cases'):
+        self.table = table
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def write_batch(self, df):
+        with self._lock:
+            df.to_sql(self.table, self._conn, if_exists='append', index=False)
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+class FileSink(Sink):
+    """Appends to a JSON Lines (.jsonl) or CSV file, one batch at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._header = not os.path.exists(path)
+
+    def write_batch(self, df):
+        if self.path.endswith('.jsonl'):
+            text = df.to_json(orient='records', lines=True)
+            if not text.endswith('\n'):
+                text += '\n'
+        else:
+            text = None
+        with self._lock:
+            if text is not None:
+                with open(self.path, 'a') as f:
+                    f.write(text)
+            else:
+                df.to_csv(self.path, mode='a', header=self._header, index=False)
+                self._header = False
+
+def to_server_schema(df):
+    """
+    Scored rows with the field names /api/ingest uses (SERVER_FIELDS). The
+    uploaded risk_score is replaced by the heuristic riskScore, as on the
+    server; other columns keep their name in camelCase.
+    """
+    df = df.drop(columns=['risk_score'], errors='ignore').rename(columns=SERVER_FIELDS)
+    return df.rename(columns=lambda c: c.split('_')[0] + ''.join(w.title() for w in c.split('_')[1:]))
+
+class FirestoreSink(Sink):
+    """
+    Writes each batch as one Firestore WriteBatch into `collection`, with
+    auto-generated document ids and the server's field names and empty
+    `notes`, like the documents /api/ingest writes.
+    Requires google-cloud-firestore and application default credentials.
+    """
+    # Firestore rejects batches with more than 500 writes
+    max_batch_size = 500
+
+    def __init__(self, collection='cases', client=None):
+        if client is None:
+            from google.cloud import firestore
+            client = firestore.Client()
+        self._client = client
+        self._collection = client.collection(collection)
+
+    def write_batch(self, df):
+        batch = self._client.batch()
+        for record in json.loads(to_server_schema(df).to_json(orient='records')):
+            record['notes'] = []
+            batch.set(self._collection.document(), record)
+        batch.commit()
+
+# --- PIPELINE ---
+class IngestionPipeline:
+    """
+    Reads chunks, scores them and hands write batches to a thread pool.
+
+    batch_size: rows per sink write (capped by the sink's max_batch_size)
+    max_concurrency: writes in flight at once
+    max_pending: batches scored but not yet written; when reached, reading
+                 blocks until a write finishes (backpressure), so memory stays
+                 bounded by about max_pending * batch_size rows
+    monitor: optional DriftMonitor (drift_monitor.py) fed with every scored chunk
+    """
+
+    def __init__(self, sink, scorer=None, batch_size=500, max_concurrency=4, max_pending=None, chunk_size=10000,
+                 monitor=None):
+        self.sink = sink
+        self.scorer = scorer or CaseScorer()
+        self.batch_size = min(batch_size, sink.max_batch_size or batch_size)
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending or 2 * max_concurrency
+        self.chunk_size = chunk_size
+        self.monitor = monitor
+
+    def _batches(self, path):
+        for chunk in read_chunks(path, self.chunk_size):
+            scored = self.scorer.score(chunk)
+            if self.monitor is not None:
+                self.monitor.update_frame(scored)
+            for start in range(0, len(scored), self.batch_size):
+                yield scored.iloc[start:start + self.batch_size]
+
+    def run(self, path):
+        """Ingests the file, returns counters. The first failed write stops the run and is raised."""
+        slots = threading.BoundedSemaphore(self.max_pending)
+        errors = []
+        stats = {'rows': 0, 'batches': 0, 'high_priority': 0, 'sla_high_risk': 0}
+        start = time.perf_counter()
+
+        def write(batch):
+            try:
+                if not errors:
+                    self.sink.write_batch(batch)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            for batch in self._batches(path):
+                slots.acquire()
+                if errors:
+                    slots.release()
+                    break
+                pool.submit(write, batch)
+                stats['rows'] += len(batch)
+                stats['batches'] += 1
+                stats['high_priority'] += int((batch['ingest_segment'] == 'High Priority').sum())
+                stats['sla_high_risk'] += int(batch['sla_high_risk'].sum())
+        if errors:
+            raise errors[0]
+
+        stats['seconds'] = time.perf_counter() - start
+        stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        return stats
+
+def main():
+    tasks_path = os.path.join(DATA_DIR, 'tasks.csv')
+    db_path = os.path.join(DATA_DIR, 'ingested_cases.db')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    # Case features against the allocator's training data, sla_risk against the SLA model's
+    references = [path for path in (ALLOCATOR_REFERENCE_PATH, SLA_REFERENCE_PATH) if os.path.exists(path)]
+    monitor = DriftMonitor({name: sketch for path in references for name, sketch in load_reference(path).items()})
+
+    print(f"Ingesting {tasks_path} into {db_path}...")
+    with SQLiteSink(db_path) as sink:
+        stats = IngestionPipeline(sink, batch_size=500, max_concurrency=4, monitor=monitor).run(tasks_path)
+        print(f"Rows in sink: {sink.count()}")
+    print(f"{stats['rows']} rows in {stats['batches']} batches, {stats['high_priority']} High Priority, "
+          f"{stats['sla_high_risk']} flagged high SLA risk")
+    print(f"{stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)")
+    if monitor.sketches:
+        print("\nDrift vs training data:")
+        print(monitor.report())
+
+if __name__ == "__main__":
+    main()
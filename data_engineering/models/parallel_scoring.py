@@ -0,0 +1,139 @@
+import numpy as np
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+def spawn_pool(n_jobs, initializer=None, initargs=()):
+    """
+    Process pool for XGBoost work, shared by parallel scoring, tuning and the
+    allocation simulator. Workers are spawned, not forked: XGBoost's OpenMP
+    runtime is not safe to fork once initialized. initializer(*initargs) runs
+    once per worker to load models into module globals and sets the worker's
+    XGBoost thread count, since the pool provides the parallelism: scoring
+    and the simulator use one thread per worker, tuning passes
+    cpu_count // n_jobs.
+    """
+    return ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp.get_context('spawn'),
+                               initializer=initializer, initargs=initargs)
+
+# --- WORKER STATE ---
+_booster = None
+_layout = None
+# Shared memory blocks of the current call, by (task block, agent block) names
+_attached = {}
+
+def _init_worker(booster_raw, layout):
+    global _booster, _layout
+    import xgboost as xgb
+    _booster = xgb.Booster()
+    _booster.load_model(bytearray(booster_raw))
+    _booster.set_param({'nthread': 1})
+    _layout = layout
+
+def _open(spec):
+    name, shape, dtype = spec
+    # Spawned workers share the parent's resource tracker, so attaching here
+    # does not hand ownership over: the parent still unlinks the block
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _attach(task_spec, agent_spec):
+    key = (task_spec[0], agent_spec[0])
+    if key not in _attached:
+        # Drop handles of blocks from previous calls
+        for old in list(_attached):
+            for shm, _ in _attached.pop(old):
+                shm.close()
+        _attached[key] = (_open(task_spec), _open(agent_spec))
+    (_, task_X), (_, agent_X) = _attached[key]
+    return task_X, agent_X
+
+def _score_tile(task_spec, agent_spec, start, stop, top_k):
+    """
+    Scores task rows [start, stop) against every agent row and keeps the top_k
+    agents per task. Only the (rows, top_k) result goes back to the parent.
+    """
+    task_X, agent_X = _attach(task_spec, agent_spec)
+    n_rows, n_agents = stop - start, len(agent_X)
+
+    X = np.empty((n_rows * n_agents, len(_layout)), dtype=np.float32)
+    for j, (side, i) in enumerate(_layout):
+        if side == 'task':
+            X[:, j] = np.repeat(task_X[start:stop, i], n_agents)
+        else:
+            X[:, j] = np.tile(agent_X[:, i], n_rows)
+    probs = _booster.inplace_predict(X).reshape(n_rows, n_agents)
+
+    if top_k < n_agents:
+        idx = np.argpartition(-probs, top_k - 1, axis=1)[:, :top_k]
+    else:
+        idx = np.broadcast_to(np.arange(n_agents), probs.shape)
+    return start, idx.astype(np.int32), np.take_along_axis(probs, idx, axis=1)
+
+def _share(arr):
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+class ParallelScorer:
+    """
+    Scores task x agent feature rows on a pool of worker processes.
+
+    The encoded task and agent arrays are placed in shared memory once per
+    call; workers build and score their own tile of pairs and send back only
+    the top-K agents per task. Each worker loads the booster once, when the
+    pool starts, and runs it single-threaded.
+
+    booster_raw: serialized booster (Booster.save_raw())
+    layout: for each model feature column, ('task', i) or ('agent', i) giving
+            the column of the task or agent array it comes from
+    """
+
+    def __init__(self, booster_raw, layout, n_jobs=None, tile_rows=512):
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.tile_rows = tile_rows
+        self._pool = spawn_pool(self.n_jobs, _init_worker, (bytes(booster_raw), list(layout)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+
+    def score_top_k(self, task_X, agent_X, top_k):
+        """
+        Returns (agent_idx, probs), both (n_tasks, top_k): the best top_k agent
+        rows for every task row, in no particular order.
+        """
+        task_X = np.ascontiguousarray(task_X, dtype=np.float32)
+        agent_X = np.ascontiguousarray(agent_X, dtype=np.float32)
+        n_tasks = len(task_X)
+        top_k = min(top_k, len(agent_X))
+        out_idx = np.empty((n_tasks, top_k), dtype=np.int32)
+        out_probs = np.empty((n_tasks, top_k), dtype=np.float32)
+        if n_tasks == 0 or top_k == 0:
+            return out_idx, out_probs
+
+        # Keep each tile around tile_rows * 64 pairs, but give every worker work
+        rows = max(1, min(self.tile_rows * 64 // max(len(agent_X), 1), -(-n_tasks // self.n_jobs)))
+
+        task_shm, task_spec = _share(task_X)
+        agent_shm, agent_spec = _share(agent_X)
+        try:
+            futures = [
+                self._pool.submit(_score_tile, task_spec, agent_spec, start, min(start + rows, n_tasks), top_k)
+                for start in range(0, n_tasks, rows)
+            ]
+            for f in futures:
+                start, idx, probs = f.result()
+                out_idx[start:start + len(idx)] = idx
+                out_probs[start:start + len(idx)] = probs
+        finally:
+            for shm in (task_shm, agent_shm):
+                shm.close()
+                shm.unlink()
+        return out_idx, out_probs
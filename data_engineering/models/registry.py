@@ -0,0 +1,132 @@
+import numpy as np
+
+class Registry:
+    """
+    Compact, array-backed table of entities (agents or tasks).
+
+    String ids are mapped to dense int32 codes (their row position) and every
+    attribute lives in one contiguous NumPy array indexed by that code, instead
+    of one Python dict per row. Categorical attributes are stored as small
+    integer codes into a sorted category list, which is the same encoding
+    sklearn's LabelEncoder produces for the same values.
+
+    registry.codes(ids)      -> int32 codes for an array of ids
+    registry.columns[name]   -> attribute array, index it with codes
+    registry[id]             -> RecordView for a single row
+    """
+    __slots__ = ('ids', 'columns', 'categories', '_sorted_ids', '_sorted_codes')
+
+    def __init__(self, ids, columns, categories=None):
+        self.ids = np.asarray(ids, dtype=str)
+        self.columns = columns
+        self.categories = categories or {}
+        order = np.argsort(self.ids, kind='stable')
+        self._sorted_ids = self.ids[order]
+        self._sorted_codes = order.astype(np.int32)
+        if len(self._sorted_ids) > 1 and (self._sorted_ids[1:] == self._sorted_ids[:-1]).any():
+            raise ValueError("Registry ids must be unique")
+
+    @classmethod
+    def from_frame(cls, df, id_column, numeric=None, categorical=None):
+        """
+        numeric: {column: dtype} copied as contiguous arrays
+        categorical: list of columns stored as codes into their sorted categories
+        """
+        columns = {}
+        categories = {}
+        for col, dtype in (numeric or {}).items():
+            columns[col] = np.ascontiguousarray(df[col].to_numpy(dtype=dtype))
+        for col in categorical or []:
+            cats, codes = np.unique(df[col].to_numpy(dtype=str), return_inverse=True)
+            categories[col] = cats
+            columns[col] = codes.reshape(-1).astype(np.int8 if len(cats) < 128 else np.int32)
+        return cls(df[id_column].to_numpy(), columns, categories)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, entity_id):
+        return bool(self.codes([entity_id], missing=-1)[0] >= 0)
+
+    def codes(self, ids, missing=None):
+        """
+        Vectorized id -> code lookup.
+        Unknown ids raise KeyError, unless `missing` is given as their code.
+        """
+        ids = np.asarray(ids, dtype=str)
+        if len(self._sorted_ids) == 0:
+            found = np.zeros(len(ids), dtype=bool)
+            codes = np.full(len(ids), -1, dtype=np.int32)
+        else:
+            pos = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+            found = self._sorted_ids[pos] == ids
+            codes = np.where(found, self._sorted_codes[pos], -1).astype(np.int32)
+        if not found.all():
+            if missing is None:
+                raise KeyError(f"Unknown ids: {ids[~found][:5].tolist()}")
+            codes[~found] = missing
+        return codes
+
+    def code(self, entity_id):
+        return int(self.codes([entity_id])[0])
+
+    def decode(self, name, codes=None):
+        """Category labels for a categorical column (all rows, or the given codes)."""
+        values = self.columns[name] if codes is None else self.columns[name][codes]
+        return self.categories[name][values]
+
+    def category_codes(self, name, labels):
+        """Maps labels to this registry's codes for a categorical column (-1 if unseen)."""
+        cats = self.categories[name]
+        labels = np.asarray(labels, dtype=str)
+        pos = np.minimum(np.searchsorted(cats, labels), len(cats) - 1)
+        return np.where(cats[pos] == labels, pos, -1)
+
+    def __getitem__(self, entity_id):
+        return RecordView(self, self.code(entity_id))
+
+class RecordView:
+    """
+    Lightweight read-only view of one registry row.
+    Supports both view['column'] and view.column; categorical columns are decoded.
+    """
+    __slots__ = ('registry', 'code')
+
+    def __init__(self, registry, code):
+        self.registry = registry
+        self.code = code
+
+    def __getitem__(self, name):
+        reg = self.registry
+        if name in reg.categories:
+            return reg.categories[name][reg.columns[name][self.code]]
+        return reg.columns[name][self.code]
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def id(self):
+        return self.registry.ids[self.code]
+
+def build_agent_registry(agents_df):
+    """Agents: skill_level (categorical), tenure_months and live workload."""
+    reg = Registry.from_frame(
+        agents_df, 'agent_id',
+        numeric={'tenure_months': np.int32},
+        categorical=['skill_level'] + (['shift'] if 'shift' in agents_df.columns else []))
+    if 'current_workload' in agents_df.columns:
+        reg.columns['workload'] = agents_df['current_workload'].fillna(0).to_numpy(dtype=np.int32, copy=True)
+    else:
+        reg.columns['workload'] = np.zeros(len(reg), dtype=np.int32)
+    return reg
+
+def build_task_registry(tasks_df):
+    """Tasks: amount_due, days_overdue, risk_score, customer_segment (categorical), entry_date."""
+    numeric = {'amount_due': np.float64, 'days_overdue': np.int32, 'risk_score': np.int32}
+    if 'entry_date' in tasks_df.columns:
+        numeric['entry_date'] = 'datetime64[D]'
+    return Registry.from_frame(tasks_df, 'task_id', numeric=numeric, categorical=['customer_segment'])
@@ -0,0 +1,89 @@
+import numpy as np
+from collections import OrderedDict
+
+class ProbabilityCache:
+    """
+    Bounded LRU cache of model outputs keyed by encoded feature tuples.
+
+    The cache is bound to a model version: binding it to a different version
+    drops every entry, so a retrained model never sees stale probabilities.
+
+    quantize: optional {column: step} map. Values of those columns are rounded
+    to the nearest multiple of `step` before they are encoded, e.g.
+    {'amount_due': 50.0, 'risk_score': 10} lets near-identical tasks share
+    entries at the cost of exactness.
+    """
+
+    def __init__(self, maxsize=100000, quantize=None):
+        self.maxsize = maxsize
+        self.quantize = dict(quantize or {})
+        self.model_version = None
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def bind(self, model_version):
+        """Invalidates the cache if the model changed since the last call."""
+        if model_version != self.model_version:
+            self._entries.clear()
+            self.model_version = model_version
+
+    def quantize_columns(self, X, columns):
+        """Returns X with the configured columns rounded to their step."""
+        if not self.quantize:
+            return X
+        X = X.copy()
+        for i, col in enumerate(columns):
+            step = self.quantize.get(col)
+            if step:
+                X[:, i] = np.round(X[:, i] / step) * step
+        return X
+
+    def get_many(self, keys):
+        """
+        Looks up a list of keys.
+        Returns (values, miss_mask); values are NaN where the key was missing.
+        """
+        values = np.full(len(keys), np.nan)
+        entries = self._entries
+        for i, key in enumerate(keys):
+            value = entries.get(key)
+            if value is not None:
+                entries.move_to_end(key)
+                values[i] = value
+        miss = np.isnan(values)
+        n_miss = int(miss.sum())
+        self.misses += n_miss
+        self.hits += len(keys) - n_miss
+        return values, miss
+
+    def put_many(self, keys, values):
+        entries = self._entries
+        for key, value in zip(keys, values):
+            entries[key] = float(value)
+            entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
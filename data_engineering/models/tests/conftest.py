@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The model scripts import their siblings directly (from registry import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from agent_stats import AgentStats
+
+def _log(rows):
+    return pd.DataFrame(rows, columns=['task_id', 'agent_id', 'outcome', 'timestamp'])
+
+INTERACTIONS = _log([
+    ('T1', 'A1', 'No Answer', '2024-01-01'),
+    ('T2', 'A1', 'Promise to Pay', '2024-01-02'),
+    ('T1', 'A1', 'Paid', '2024-01-05'),
+    ('T3', 'A2', 'No Answer', '2024-01-05'),
+    # Paid task touched again, by its holder and by another agent
+    ('T1', 'A1', 'Paid', '2024-01-06'),
+    ('T1', 'A2', 'No Answer', '2024-01-07'),
+    # Open task taken over by another agent, then paid
+    ('T2', 'A2', 'Paid', '2024-01-09'),
+    ('T4', 'A3', 'No Answer', '2024-01-10'),
+])
+TASKS = pd.DataFrame({'task_id': ['T1', 'T2', 'T3', 'T4'], 'risk_score': [500, 600, 700, 800]})
+
+def test_payment_counts_once_for_the_holder():
+    stats = AgentStats()
+    stats.replay_interactions(INTERACTIONS, TASKS)
+    table = stats.table()
+    assert table.loc['A1', ['assigned', 'active', 'paid']].tolist() == [2, 0, 1]
+    assert table.loc['A2', ['assigned', 'active', 'paid']].tolist() == [2, 1, 1]
+    assert table.loc['A1', 'days_to_pay_sum'] == 4
+    # T2 was first assigned on day 2: days to pay count from there
+    assert table.loc['A2', 'days_to_pay_sum'] == 7
+    assert table.loc['A2', 'risk_sum'] == 1300
+
+def test_ignored_events_still_count():
+    stats = AgentStats()
+    stats.assign('T1', 'A1', '2024-01-01')
+    stats.assign('T1', 'A1', '2024-01-03')
+    stats.outcome('T1', 'Paid', '2024-01-04')
+    stats.outcome('T1', 'Paid', '2024-01-05', agent_id='A2')
+    # Two assigns, the payment, then a takeover attempt and an outcome on the paid task
+    assert stats.events == 5
+    assert stats.last_day == np.datetime64('2024-01-05', 'D').astype(np.int64)
+    assert stats.table().loc['A2', 'assigned'] == 0
+
+def test_replay_resumes_from_snapshot(tmp_path):
+    path = str(tmp_path / 'stats.npz')
+    head, tail = INTERACTIONS.iloc[:5], INTERACTIONS.iloc[5:]
+
+    full = AgentStats()
+    full.replay_interactions(head, TASKS, snapshot_every=1, snapshot_path=path)
+    # The last periodic snapshot holds the state after the last event
+    restored = AgentStats.load(path)
+    assert restored.table().equals(full.table())
+    assert restored.tasks == full.tasks
+    assert (restored.events, restored.last_day) == (full.events, full.last_day)
+
+    full.replay_interactions(tail, TASKS)
+    restored.replay_interactions(tail, TASKS)
+    assert restored.table().equals(full.table())
+    assert restored.tasks == full.tasks
+    assert (restored.events, restored.last_day) == (full.events, full.last_day)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('xgboost')
+
+from ai_allocator import greedy_assign
+
+def _pairwise_greedy(task_bucket_probs, agent_bucket, loads, max_tasks_per_agent):
+    """Reference: every (task, agent) pair in descending probability order, no buckets, no pruning."""
+    n_tasks, n_agents = task_bucket_probs.shape[0], len(agent_bucket)
+    probs = task_bucket_probs[:, agent_bucket]
+    loads = loads.copy()
+    done = np.zeros(n_tasks, dtype=bool)
+    assigned = {}
+    for pair in np.argsort(-probs, axis=None, kind='stable'):
+        t, a = divmod(int(pair), n_agents)
+        if done[t] or loads[a] >= max_tasks_per_agent:
+            continue
+        done[t] = True
+        loads[a] += 1
+        assigned[t] = (int(agent_bucket[a]), float(probs[t, a]))
+    return assigned
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('cap', [3, 10, 50])
+@pytest.mark.parametrize('top_buckets', [1, 3, None])
+def test_pruned_greedy_matches_pairwise_greedy(seed, cap, top_buckets):
+    rng = np.random.default_rng(seed)
+    n_tasks, n_agents, n_buckets = 200, 40, 12
+    task_bucket_probs = rng.random((n_tasks, n_buckets))
+    agent_bucket = rng.integers(n_buckets, size=n_agents)
+    loads = rng.integers(0, cap + 1, size=n_agents)
+
+    expected = _pairwise_greedy(task_bucket_probs, agent_bucket, loads, cap)
+    task_idx, agent_idx, probs = greedy_assign(task_bucket_probs, agent_bucket, loads.copy(), cap,
+                                               top_buckets=top_buckets)
+    # Agents within a bucket are interchangeable, so compare the bucket each task went to
+    got = {int(t): (int(agent_bucket[a]), float(p)) for t, a, p in zip(task_idx, agent_idx, probs)}
+    assert got == expected
+
+def test_loads_stay_within_cap():
+    rng = np.random.default_rng(0)
+    task_bucket_probs = rng.random((300, 6))
+    agent_bucket = rng.integers(6, size=20)
+    loads = rng.integers(0, 5, size=20)
+    start = loads.copy()
+    task_idx, agent_idx, _ = greedy_assign(task_bucket_probs, agent_bucket, loads, 10, top_buckets=2)
+    assert len(set(task_idx.tolist())) == len(task_idx)
+    np.testing.assert_array_equal(loads, start + np.bincount(agent_idx, minlength=20))
+    assert loads.max() <= 10
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('xgboost')
+
+from incremental_allocator import IncrementalAllocator
+
+class _LeastLoadedAllocator:
+    """Stands in for SmartAllocator: each task in order goes to the least loaded agent with room."""
+
+    def __init__(self):
+        self.calls = []
+
+    def allocate_bulk(self, tasks_df, agents_df, max_tasks_per_agent=50, top_buckets=5):
+        self.calls.append((tasks_df.copy(), agents_df.copy()))
+        loads = dict(zip(agents_df['agent_id'], agents_df['current_workload']))
+        rows = []
+        for t_id in tasks_df['task_id']:
+            a_id = min(loads, key=lambda a: (loads[a], a))
+            if loads[a_id] >= max_tasks_per_agent:
+                break
+            loads[a_id] += 1
+            rows.append({'task_id': t_id, 'assigned_agent_id': a_id, 'predicted_success_prob': 0.5})
+        return pd.DataFrame(rows, columns=['task_id', 'assigned_agent_id', 'predicted_success_prob'])
+
+def _agents(*ids):
+    return pd.DataFrame({'agent_id': list(ids), 'skill_level': 'Junior', 'tenure_months': 12})
+
+def _tasks(*ids):
+    return pd.DataFrame({'task_id': list(ids), 'amount_due': 100.0, 'days_overdue': 5,
+                         'risk_score': 600, 'customer_segment': 'Retail'})
+
+def _check_state(inc):
+    # The reverse index, the workloads and the pending queue all agree with the assignments
+    held = {}
+    for t_id, a_id in inc.assignments.items():
+        held.setdefault(a_id, set()).add(t_id)
+    assert {a: set(t) for a, t in inc.tasks_of.items()} == held
+    agents = inc.agents
+    for a_id, workload in agents['current_workload'].items():
+        assert workload == len(held.get(a_id, ()))
+    assert set(inc.pending) == set(inc.tasks.index) - set(inc.assignments)
+    assert agents['tenure_months'].dtype == np.int64
+    assert agents['current_workload'].dtype == np.int64
+    assert inc.tasks['amount_due'].dtype == np.float64
+
+def test_add_allocate_remove_reoffer_complete():
+    inc = IncrementalAllocator(_LeastLoadedAllocator(), max_tasks_per_agent=2)
+    _check_state(inc)
+
+    inc.add_agents(_agents('A1', 'A2'))
+    inc.add_tasks(_tasks('T1', 'T2', 'T3', 'T4', 'T5'))
+    first = inc.allocate()
+    assert len(first) == 4 and list(inc.pending) == ['T5']
+    _check_state(inc)
+
+    # A1 goes off shift: its tasks are re-offered, to A3 who comes on shift
+    held_by_a1 = set(inc.tasks_of['A1'])
+    orphaned = inc.remove_agents(['A1'])
+    assert set(orphaned) == held_by_a1 and len(orphaned) == 2
+    assert 'A1' not in inc.agents.index
+    inc.add_agents(_agents('A3'))
+    _check_state(inc)
+    reoffer = inc.allocate()
+    assert set(inc.allocator.calls[-1][0]['task_id']) == {'T5'} | held_by_a1
+    assert list(inc.allocator.calls[-1][1]['agent_id']) == ['A3']
+    assert set(reoffer['assigned_agent_id']) == {'A3'} and len(reoffer) == 2
+    assert len(inc.pending) == 1
+    _check_state(inc)
+
+    # Completing a task frees its agent for the last pending one
+    done = next(iter(inc.tasks_of['A2']))
+    inc.complete_tasks([done])
+    assert done not in inc.tasks.index
+    _check_state(inc)
+    last = inc.allocate()
+    assert list(last['assigned_agent_id']) == ['A2'] and not inc.pending
+    _check_state(inc)
+
+    # Re-adding agents without a workload column counts what they hold here
+    inc.add_agents(_agents('A1', 'A2'))
+    assert inc.agents.loc['A1', 'current_workload'] == 0
+    assert inc.agents.loc['A2', 'current_workload'] == 2
+    _check_state(inc)
+    assert inc.allocate().empty
+    assert len(inc.assignments) == 4
+
+def test_storage_reuses_slots():
+    inc = IncrementalAllocator(_LeastLoadedAllocator(), max_tasks_per_agent=100)
+    inc.add_agents(_agents(*[f"A{i}" for i in range(40)]))
+    for batch in range(5):
+        ids = [f"T{batch}_{i}" for i in range(30)]
+        inc.add_tasks(_tasks(*ids))
+        inc.allocate()
+        inc.complete_tasks(ids)
+    # Completed tasks free their slots, so five batches fit in the space of one
+    assert len(inc.tasks) == 0 and len(inc._tasks.live) == 32
+    _check_state(inc)
@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest_pipeline import CaseScorer, FileSink, FirestoreSink, IngestionPipeline, Sink, SQLiteSink, heuristic_risk
+
+N_ROWS = 1203
+# Stand-ins for the trained artifacts: sla_risk rises with days overdue > 90
+SLA_PARAMS = {'mean': np.zeros(4), 'scale': np.ones(4), 'coef': np.array([3.0, 0.0, 0.0, 0.0]), 'intercept': -1.0}
+ALLOCATOR_META = {'categories': {'customer_segment': ['Corporate', 'Retail', 'SME']}}
+
+@pytest.fixture
+def cases_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    # Upload headers, as in sample.csv
+    df = pd.DataFrame({
+        'Customer Name': [f"Customer {i}" for i in range(N_ROWS)],
+        'Amount': np.round(rng.uniform(50, 20000, N_ROWS), 2),
+        'Days Overdue': rng.integers(0, 150, N_ROWS),
+        'Risk Score': rng.integers(300, 851, N_ROWS),
+        'Segment': rng.choice(['Retail', 'SME', 'Corporate', 'Unknown'], N_ROWS),
+    })
+    path = tmp_path / 'cases.csv'
+    df.to_csv(path, index=False)
+    return str(path), df
+
+def _pipeline(sink, **kwargs):
+    return IngestionPipeline(sink, scorer=CaseScorer(SLA_PARAMS, ALLOCATOR_META), **kwargs)
+
+def _check_scored(out, upload):
+    out = out.sort_values('customer_name').reset_index(drop=True)
+    upload = upload.sort_values('Customer Name').reset_index(drop=True)
+    assert out['customer_name'].tolist() == upload['Customer Name'].tolist()
+    np.testing.assert_allclose(out['amount_due'], upload['Amount'])
+    risk, segment = heuristic_risk(upload['Amount'], upload['Days Overdue'])
+    np.testing.assert_array_equal(out['ingest_risk_score'], risk)
+    np.testing.assert_array_equal(out['ingest_segment'], segment)
+    np.testing.assert_array_equal(out['sla_high_risk'], (upload['Days Overdue'] > 90).astype(int))
+    codes = upload['Segment'].map({'Corporate': 0, 'Retail': 1, 'SME': 2}).fillna(-1)
+    np.testing.assert_array_equal(out['customer_segment_encoded'], codes)
+
+def test_sqlite_sink_round_trip(cases_csv, tmp_path):
+    path, upload = cases_csv
+    db_path = str(tmp_path / 'cases.db')
+    with SQLiteSink(db_path) as sink:
+        stats = _pipeline(sink, batch_size=100, max_concurrency=3, chunk_size=250).run(path)
+        assert sink.count() == N_ROWS
+    # 4 chunks of 250 rows (3 batches each) and one of 203 rows (3 batches)
+    assert stats['rows'] == N_ROWS and stats['batches'] == 15
+    with sqlite3.connect(db_path) as conn:
+        out = pd.read_sql('SELECT * FROM cases', conn)
+    _check_scored(out, upload)
+
+@pytest.mark.parametrize('suffix', ['jsonl', 'csv'])
+def test_file_sink_round_trip(cases_csv, tmp_path, suffix):
+    path, upload = cases_csv
+    out_path = str(tmp_path / f'scored.{suffix}')
+    with FileSink(out_path) as sink:
+        _pipeline(sink, batch_size=128, max_concurrency=4, chunk_size=500).run(path)
+    out = pd.read_json(out_path, lines=True) if suffix == 'jsonl' else pd.read_csv(out_path)
+    assert len(out) == N_ROWS
+    _check_scored(out, upload)
+
+class _FakeFirestore:
+    """Records what FirestoreSink sends: one list of (document id, record) per committed batch."""
+
+    def __init__(self):
+        self.commits = []
+        self.collections = []
+        self._ids = iter(range(10 ** 9))
+        self._lock = threading.Lock()
+
+    def collection(self, name):
+        self.collections.append(name)
+        return self
+
+    def document(self):
+        with self._lock:
+            return f"doc{next(self._ids)}"
+
+    def batch(self):
+        client = self
+
+        class Batch:
+            def __init__(self):
+                self.writes = []
+
+            def set(self, doc, record):
+                self.writes.append((doc, record))
+
+            def commit(self):
+                with client._lock:
+                    client.commits.append(self.writes)
+        return Batch()
+
+def test_firestore_sink_batches_and_fields(cases_csv):
+    path, upload = cases_csv
+    client = _FakeFirestore()
+    pipeline = _pipeline(FirestoreSink('cases', client=client), batch_size=2000)
+    assert pipeline.batch_size == 500
+    pipeline.run(path)
+
+    assert client.collections == ['cases']
+    assert sorted(len(writes) for writes in client.commits) == [203, 500, 500]
+    writes = [w for commit in client.commits for w in commit]
+    assert len({doc for doc, _ in writes}) == N_ROWS
+
+    record = next(r for _, r in writes if r['customerName'] == upload.loc[0, 'Customer Name'])
+    risk, segment = heuristic_risk(upload.loc[:0, 'Amount'], upload.loc[:0, 'Days Overdue'])
+    # The server's field names; riskScore is the /api/ingest heuristic, not the uploaded score
+    assert record['amount'] == upload.loc[0, 'Amount']
+    assert record['daysOverdue'] == upload.loc[0, 'Days Overdue']
+    assert record['riskScore'] == risk[0] and record['segment'] == segment[0]
+    assert record['status'] == 'New' and record['assignedAgency'] == 'Unassigned'
+    assert record['notes'] == [] and record['createdAt'] == record['updatedAt']
+    assert not {'risk_score', 'customer_name', 'amount_due', 'ingest_risk_score'} & set(record)
+
+class _FailingSink(Sink):
+    def __init__(self, fail_on):
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def write_batch(self, df):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError('sink unavailable')
+
+def test_first_write_error_stops_the_run(cases_csv):
+    path, _ = cases_csv
+    sink = _FailingSink(fail_on=3)
+    with pytest.raises(RuntimeError, match='sink unavailable'):
+        _pipeline(sink, batch_size=10, max_concurrency=1).run(path)
+    # No write is attempted after the failed one (121 batches in the file)
+    assert sink.calls == 3
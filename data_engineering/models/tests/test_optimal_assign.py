@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip('xgboost')
+
+from allocation_simulator import optimal_assign
+
+def _brute_force_best(task_bucket_probs, agent_bucket, loads, max_tasks_per_agent):
+    """Best total probability over every way to send each task to one agent or leave it out."""
+    n_tasks, n_agents = task_bucket_probs.shape[0], len(agent_bucket)
+    spare = np.clip(max_tasks_per_agent - loads, 0, None)
+    best = 0.0
+    for choice in itertools.product(range(-1, n_agents), repeat=n_tasks):
+        choice = np.array(choice)
+        placed = choice >= 0
+        if (np.bincount(choice[placed], minlength=n_agents) > spare).any():
+            continue
+        best = max(best, task_bucket_probs[np.flatnonzero(placed), agent_bucket[choice[placed]]].sum())
+    return best
+
+@pytest.mark.parametrize('seed', range(12))
+def test_optimal_assign_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n_tasks, n_agents, n_buckets = int(rng.integers(3, 7)), int(rng.integers(2, 5)), 3
+    task_bucket_probs = rng.random((n_tasks, n_buckets))
+    # Some repeated task rows
+    task_bucket_probs[rng.random(n_tasks) < 0.3] = task_bucket_probs[0]
+    agent_bucket = rng.integers(n_buckets, size=n_agents)
+    cap = int(rng.integers(1, 3))
+    loads = rng.integers(0, cap + 1, size=n_agents)
+    start = loads.copy()
+
+    t, a, p = optimal_assign(task_bucket_probs, agent_bucket, loads, cap)
+
+    assert len(set(t.tolist())) == len(t)
+    np.testing.assert_allclose(p, task_bucket_probs[t, agent_bucket[a]])
+    np.testing.assert_array_equal(loads, start + np.bincount(a, minlength=n_agents))
+    assert (loads[loads > start] <= cap).all()
+    assert p.sum() == pytest.approx(_brute_force_best(task_bucket_probs, agent_bucket, start, cap), abs=1e-9)
+
+@pytest.mark.parametrize('seed', range(4))
+def test_optimal_assign_matches_lp_on_crowded_buckets(seed):
+    linprog = pytest.importorskip('scipy.optimize').linprog
+    rng = np.random.default_rng(seed)
+    n_tasks, n_buckets, cap = 300, 8, 3
+    # Every task prefers the same few buckets, so they fill up and tasks must be moved or dropped
+    task_bucket_probs = rng.random((n_tasks, n_buckets)) * np.linspace(1.0, 0.3, n_buckets)
+    agent_bucket = rng.integers(n_buckets, size=60)
+    loads = rng.integers(0, cap + 1, size=60)
+    spare = np.bincount(agent_bucket, weights=cap - loads, minlength=n_buckets)
+
+    t, a, p = optimal_assign(task_bucket_probs, agent_bucket, loads.copy(), cap)
+
+    # Same problem as an LP over every (task, bucket) pair
+    A = np.vstack([np.kron(np.eye(n_tasks), np.ones(n_buckets)), np.tile(np.eye(n_buckets), n_tasks)])
+    res = linprog(-task_bucket_probs.ravel(), A_ub=A, b_ub=np.concatenate([np.ones(n_tasks), spare]),
+                  bounds=(0, None), method='highs')
+    assert len(t) == min(n_tasks, int(spare.sum()))
+    assert p.sum() == pytest.approx(-res.fun, abs=1e-7)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+xgb = pytest.importorskip('xgboost')
+
+import inference
+from tree_compiler import CompiledTrees, compile_booster
+
+def _model_with_missing(seed=0):
+    """Small binary:logistic model on data where missingness carries signal, so default_left matters."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(3000, 4)).astype(np.float32)
+    missing = rng.random(X.shape) < 0.25
+    y = ((X[:, 0] + X[:, 1] * X[:, 2] > 0) | missing[:, 3]).astype(int)
+    X[missing] = np.nan
+    model = xgb.XGBClassifier(n_estimators=30, max_depth=4, learning_rate=0.3, random_state=seed)
+    model.fit(X, y)
+    return model, X
+
+def test_matches_xgboost_with_missing_values():
+    model, X = _model_with_missing()
+    compiled = compile_booster(model.get_booster())
+    # Missing values are routed both ways somewhere in the ensemble
+    split = compiled.left != np.arange(len(compiled.left))
+    assert compiled.default_left[split].any() and not compiled.default_left[split].all()
+    assert np.isnan(X).any(axis=1).mean() > 0.5
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X)[:, 1], atol=1e-5)
+
+def test_all_missing_rows_follow_default_branches():
+    model, X = _model_with_missing(seed=1)
+    compiled = compile_booster(model.get_booster())
+    X = np.full((5, X.shape[1]), np.nan, dtype=np.float32)
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X)[:, 1], atol=1e-5)
+
+def test_saved_trees_are_used_by_inference(tmp_path):
+    model, X = _model_with_missing(seed=2)
+    compile_booster(model.get_booster()).save(str(tmp_path))
+    booster, _ = inference.load_allocator(meta_path=str(tmp_path / 'no_meta.json'), trees_path=str(tmp_path))
+    assert isinstance(booster, CompiledTrees)
+    np.testing.assert_allclose(inference.predict_proba(booster, X), model.predict_proba(X)[:, 1], atol=1e-5)
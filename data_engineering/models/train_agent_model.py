@@ -1,13 +1,11 @@
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, roc_auc_score, confusion_matrix, classification_report
-from sklearn.preprocessing import OneHotEncoder
-import matplotlib.pyplot as plt
 import os
 import random
 
+from drift_monitor import AGENT_REFERENCE_PATH, build_reference, save_reference
+
 # --- CONFIG ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
@@ -61,6 +59,11 @@ def preprocess_data(agents, tasks, interactions):
     return X, y, df
 
 def train_model(X, y):
+    # Training-only dependencies
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score, roc_auc_score, classification_report
+    import matplotlib.pyplot as plt
+    
     print("Training XGBoost Classifier...")
     
     # Split
@@ -104,62 +107,65 @@ def train_model(X, y):
     return model, X.columns.tolist()
 
 # --- INFERENCE FUNCTION ---
+def build_feature_matrix(requests, feature_columns, current_hour=14):
+    """
+    Builds one feature matrix for several recommendation requests at once.
+
+    requests: list of (task_data, available_agents_list) tuples
+    feature_columns: list of columns expected by the model
+
+    Returns (DataFrame with one row per (task, agent) pair, offsets) where the
+    rows of request i are X.iloc[offsets[i]:offsets[i + 1]].
+    """
+    sizes = [len(agents) for _, agents in requests]
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(int)
+    col_idx = {c: i for i, c in enumerate(feature_columns)}
+    X = np.zeros((offsets[-1], len(feature_columns)), dtype=np.float64)
+    
+    def fill(col, values):
+        if col in col_idx:
+            X[:, col_idx[col]] = values
+    
+    def one_hot(prefix, values):
+        # Unknown categories leave every dummy at 0, like the reindex in training
+        idx = np.array([col_idx.get(f"{prefix}_{v}", -1) for v in values], dtype=int)
+        known = idx >= 0
+        X[np.flatnonzero(known), idx[known]] = 1
+    
+    agents = [a for _, agent_list in requests for a in agent_list]
+    tasks = [t for (t, _), n in zip(requests, sizes) for _ in range(n)]
+    
+    fill('amount_due', [t['amount_due'] for t in tasks])
+    fill('days_overdue', [t['days_overdue'] for t in tasks])
+    fill('risk_score', [t['risk_score'] for t in tasks])
+    fill('tenure_months', [a['tenure_months'] for a in agents])
+    # Current simulated context (e.g., 2 PM)
+    fill('hour_of_day', current_hour)
+    one_hot('customer_segment', [t['customer_segment'] for t in tasks])
+    one_hot('skill_level', [a['skill_level'] for a in agents])
+    
+    return pd.DataFrame(X, columns=feature_columns), offsets
+
 def recommend_best_agent(task_data, available_agents_list, model, feature_columns):
     """
     task_data: dict containing 'amount_due', 'days_overdue', 'risk_score', 'customer_segment'
-    available_agents_list: list of dicts (or df) containing 'agent_id', 'tenure_months', 'skill_level'
+    available_agents_list: list of dicts containing 'agent_id', 'tenure_months', 'skill_level'
     model: trained xgb model
     feature_columns: list of columns expected by the model
     """
-    
-    recommendations = []
-    
-    # Current simulated context (e.g., 2 PM)
-    current_hour = 14 
-    
-    for agent in available_agents_list:
-        # Construct input row
-        row = {
-            'amount_due': task_data['amount_due'],
-            'days_overdue': task_data['days_overdue'],
-            'risk_score': task_data['risk_score'],
-            'tenure_months': agent['tenure_months'],
-            'hour_of_day': current_hour
-        }
-        
-        # DataFrame for one row
-        input_df = pd.DataFrame([row])
-        
-        # Handle Categoricals (Customer Segment)
-        seg_col = f"customer_segment_{task_data['customer_segment']}"
-        skill_col = f"skill_level_{agent['skill_level']}"
-        
-        # Initialize all known categorical cols to 0
-        known_cat_cols = [c for c in feature_columns if 'customer_segment_' in c or 'skill_level_' in c]
-        for col in known_cat_cols:
-            input_df[col] = 0
-            
-        # Set active ones to 1
-        if seg_col in input_df.columns:
-            input_df[seg_col] = 1
-        if skill_col in input_df.columns:
-            input_df[skill_col] = 1
-            
-        # Reorder to match model expectation
-        input_df = input_df.reindex(columns=feature_columns, fill_value=0)
-        
-        # Predict
-        prob = model.predict_proba(input_df)[0, 1]
-        
-        recommendations.append({
-            'agent_id': agent['agent_id'],
-            'success_probability': prob
-        })
-        
-    # Sort by probability DESC
-    recommendations.sort(key=lambda x: x['success_probability'], reverse=True)
-    
-    return recommendations[0] if recommendations else None
+    if not available_agents_list:
+        return None
+    
+    # All agents are scored in a single model call
+    X, _ = build_feature_matrix([(task_data, available_agents_list)], feature_columns)
+    probs = model.predict_proba(X)[:, 1]
+    
+    # Highest probability wins (first agent on ties)
+    best = int(np.argmax(probs))
+    return {
+        'agent_id': available_agents_list[best]['agent_id'],
+        'success_probability': probs[best]
+    }
 
 def run_functional_tests(model, features, agents_df):
     print("\nRunning Functional Tests...")
@@ -198,6 +204,16 @@ def main():
     # 2. Train
     model, features = train_model(X, y)
     
+    # Training distribution of inputs and scores, for drift monitoring
+    reference = {col: full_df[col].to_numpy() for col in ['amount_due', 'days_overdue', 'risk_score', 'tenure_months',
+                                                          'hour_of_day', 'customer_segment', 'skill_level']}
+    # Scores of the held-out rows only: in-sample scores are overconfident
+    from sklearn.model_selection import train_test_split
+    _, X_test = train_test_split(X, test_size=0.2, random_state=42)  # same split as train_model
+    reference['success_prob'] = model.predict_proba(X_test)[:, 1]
+    save_reference(build_reference(reference, categorical=['customer_segment', 'skill_level']), AGENT_REFERENCE_PATH)
+    print(f"Drift reference saved to {AGENT_REFERENCE_PATH}")
+    
     # 3. Test Functionality
     run_functional_tests(model, features, agents_df)
 
@@ -1,10 +1,5 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
-from sklearn.preprocessing import OneHotEncoder
-import matplotlib.pyplot as plt
 import os
 import joblib
 
@@ -18,7 +13,7 @@ def load_data():
     interactions = pd.read_csv(os.path.join(DATA_DIR, 'interactions.csv'))
     return agents, interactions
 
-def aggregate_weekly_metrics(interactions_df, agents_df):
+def aggregate_weekly_metrics(interactions_df, agents_df, drop_unlabeled=True):
     print("Aggregating weekly metrics...")
     
     # 1. Convert Timestamp
@@ -82,8 +77,9 @@ def aggregate_weekly_metrics(interactions_df, agents_df):
     # 8. Merge with Agent Profiles
     main_df = weekly_agg.merge(agents_df[['agent_id', 'tenure_months', 'skill_level']], on='agent_id', how='left')
     
-    # Drop rows with missing targets
-    main_df = main_df.dropna(subset=['next_week_recovery_rate'])
+    # Drop rows with missing targets (keep them to predict the coming week)
+    if drop_unlabeled:
+        main_df = main_df.dropna(subset=['next_week_recovery_rate'])
     
     print(f"Aggregated Data Shape: {main_df.shape}")
     return main_df
@@ -115,6 +111,11 @@ def feature_engineering(df):
     return X, y
 
 def train_model(X, y):
+    # Training-only dependencies
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+    
     print("Training Random Forest Regressor...")
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -1,12 +1,12 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-from sklearn.preprocessing import StandardScaler
 import os
 import joblib
 
+from registry import build_task_registry
+from inference import save_sla_model, load_sla_model, predict_sla_risk, sla_features
+from drift_monitor import SLA_REFERENCE_PATH, build_reference, save_reference
+
 # --- CONFIG ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
@@ -20,21 +20,24 @@ def load_data():
 def feature_engineering(tasks_df, interactions_df):
     print("Feature Engineering...")
     
+    # Index interactions by dense task codes instead of grouping/merging on id strings
+    tasks = build_task_registry(tasks_df)
+    codes = tasks.codes(interactions_df['task_id'].to_numpy(), missing=-1)
+    known = codes >= 0
+    
     # 1. Total Attempts per Task
-    # Count all interactions for each task
-    attempts = interactions_df.groupby('task_id').size().reset_index(name='total_attempts')
+    # Count all interactions for each task (0 for tasks without interactions)
+    attempts = np.bincount(codes[known], minlength=len(tasks))
     
     # 2. Check if Task is Paid
     # Identify tasks that have ANY 'Paid' outcome
-    paid_tasks = interactions_df[interactions_df['outcome'] == 'Paid']['task_id'].unique()
+    is_paid = np.zeros(len(tasks), dtype=np.int64)
+    is_paid[codes[known & (interactions_df['outcome'] == 'Paid').to_numpy()]] = 1
     
-    # Merge attempts back to tasks_df
-    # We use left join to keep all tasks (some might have 0 attempts if new - though gen script ensures 1+)
-    df = tasks_df.merge(attempts, on='task_id', how='left')
-    df['total_attempts'] = df['total_attempts'].fillna(0)
-    
-    # Create is_paid flag
-    df['is_paid'] = df['task_id'].isin(paid_tasks).astype(int)
+    # Registry codes are row positions of tasks_df, so the arrays line up with it
+    df = tasks_df.copy()
+    df['total_attempts'] = attempts
+    df['is_paid'] = is_paid
     
     # 3. Create 'is_stagnant'
     # Definition: total_attempts > 5 AND status is NOT 'Paid'
@@ -50,6 +53,12 @@ def feature_engineering(tasks_df, interactions_df):
     return df
 
 def train_model(df):
+    # Training-only dependencies
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score, classification_report
+    from sklearn.preprocessing import StandardScaler
+    
     print("Training Logistic Regression Model...")
     
     # Feature Engineering for Model
@@ -109,6 +118,15 @@ def train_model(df):
     
     # Save Model
     joblib.dump(model, os.path.join(SCRIPT_DIR, 'sla_risk_model.pkl'))
+    # Scaler + coefficients for the inference runtime (inference.py)
+    save_sla_model(scaler, model, features)
+    # Drift reference for ingestion: held-out cases scored the way
+    # ingest_pipeline.CaseScorer scores new ones, with no interactions yet
+    test_rows = df.iloc[X_test.index.to_numpy()]
+    new_cases = sla_features(test_rows['days_overdue'].to_numpy(), np.zeros(len(test_rows)), np.zeros(len(test_rows)))
+    reference = {'sla_risk': predict_sla_risk(load_sla_model(), new_cases)}
+    save_reference(build_reference(reference), SLA_REFERENCE_PATH)
+    print(f"Drift reference saved to {SLA_REFERENCE_PATH}")
     
     return model, acc
 
@@ -1,9 +1,5 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, r2_score
-import matplotlib.pyplot as plt
 import os
 import joblib
 from datetime import timedelta
@@ -43,6 +39,10 @@ def preprocess_data(tasks):
     return daily_counts
 
 def train_model(df):
+    # Training-only dependencies
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_absolute_error, r2_score
+    
     print("Training Volume Forecasting Model...")
     
     features = ['day_of_week', 'month', 'day_of_year', 'is_weekend']
@@ -90,6 +90,7 @@ def forecast_future(model, last_date, days=30):
     return future_df
 
 def plot_forecast(full_df, future_df):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 6))
     
     # Historical
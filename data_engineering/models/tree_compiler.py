@@ -0,0 +1,190 @@
+import numpy as np
+import json
+import os
+import time
+
+class CompiledTrees:
+    """
+    A binary:logistic XGBoost model flattened into contiguous node arrays.
+
+    Every tree is stored in the same arrays (feature, threshold, left, right,
+    default_left, value) with its nodes at a fixed offset. Leaves point to
+    themselves, so all rows can be walked level by level for max_depth steps
+    without branching per row. Needs only NumPy: no XGBoost import, nothing
+    that is unsafe to fork, and the arrays can be memory-mapped by several
+    worker processes (see save/load).
+    """
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots')
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots,
+                 base_margin, max_depth, feature_names):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.base_margin = base_margin
+        self.max_depth = max_depth
+        self.feature_names = feature_names
+        # Interleaved (left, right) so a step is a single gather
+        self._children = np.stack([left, right], axis=1).ravel().astype(np.int32)
+
+    def predict_margin(self, X, chunk_rows=2048):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        has_missing = bool(np.isnan(X).any())
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), chunk_rows):
+            out[start:start + chunk_rows] = self._margin(X[start:start + chunk_rows], has_missing)
+        return out
+
+    def _margin(self, X, has_missing):
+        n, n_features = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n, dtype=np.int32) * n_features)[:, None]
+        # (rows, trees) current node of every row in every tree
+        node = np.tile(self.roots, (n, 1))
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[node]]
+            # XGBoost: go left if x < threshold, missing values follow default_left
+            go_right = ~(x < self.threshold[node])
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.default_left[node], go_right)
+            node = self._children[2 * node + go_right]
+        # XGBoost accumulates leaf values in float32
+        return self.value[node].sum(axis=1, dtype=np.float32) + self.base_margin
+
+    def predict_proba(self, X):
+        """P(class 1) for each row, like XGBClassifier.predict_proba(X)[:, 1]."""
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+
+    def save(self, path):
+        """Saves to a directory of .npy files (one per array) plus meta.json."""
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'base_margin': self.base_margin, 'max_depth': self.max_depth,
+                       'feature_names': self.feature_names}, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        With mmap_mode='r' (default) the arrays are memory-mapped read-only,
+        so worker processes loading the same directory share the pages.
+        """
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in cls.ARRAYS}
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        return cls(**arrays, **meta)
+
+def _parse_base_score(value):
+    # Stored as '5E-1' in older versions and as '[5E-1]' in newer ones
+    return float(str(value).strip('[]'))
+
+def compile_booster(booster):
+    """Flattens a binary:logistic booster (XGBClassifier.get_booster()) into CompiledTrees."""
+    model = json.loads(bytes(booster.save_raw('json')))
+    learner = model['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Only binary:logistic models can be compiled, got {objective}")
+    gbm = learner['gradient_booster']
+    if gbm['name'] != 'gbtree':
+        raise ValueError(f"Only gbtree boosters can be compiled, got {gbm['name']}")
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in gbm['model']['trees']:
+        if any(tree['split_type']):
+            raise ValueError("Categorical splits are not supported")
+        lc = np.asarray(tree['left_children'], dtype=np.int32)
+        rc = np.asarray(tree['right_children'], dtype=np.int32)
+        cond = np.asarray(tree['split_conditions'], dtype=np.float32)
+        n = len(lc)
+        ids = np.arange(n, dtype=np.int32)
+        is_leaf = lc == -1
+
+        feature.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+        threshold.append(np.where(is_leaf, np.float32(np.inf), cond))
+        # Leaves loop back to themselves
+        left.append(np.where(is_leaf, ids, lc) + offset)
+        right.append(np.where(is_leaf, ids, rc) + offset)
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        # For leaves, split_conditions holds the leaf value
+        value.append(np.where(is_leaf, cond, 0).astype(np.float32))
+        roots.append(offset)
+
+        depth = np.zeros(n, dtype=np.int32)
+        for i in range(n):
+            if not is_leaf[i]:
+                depth[lc[i]] = depth[rc[i]] = depth[i] + 1
+        max_depth = max(max_depth, int(depth.max()))
+        offset += n
+
+    base_score = _parse_base_score(learner['learner_model_param']['base_score'])
+    return CompiledTrees(
+        feature=np.concatenate(feature), threshold=np.concatenate(threshold),
+        left=np.concatenate(left).astype(np.int32), right=np.concatenate(right).astype(np.int32),
+        default_left=np.concatenate(default_left), value=np.concatenate(value),
+        roots=np.asarray(roots, dtype=np.int32),
+        base_margin=float(np.log(base_score / (1.0 - base_score))),
+        max_depth=max_depth, feature_names=learner.get('feature_names') or None)
+
+def check_parity(model, compiled, X, atol=1e-5):
+    """
+    Compares the compiled trees with XGBClassifier.predict_proba on X.
+    Returns the max absolute difference, raises AssertionError above atol.
+    """
+    expected = model.predict_proba(X)[:, 1]
+    got = compiled.predict_proba(np.asarray(X, dtype=np.float32))
+    diff = float(np.max(np.abs(expected - got))) if len(expected) else 0.0
+    if diff > atol:
+        raise AssertionError(f"Compiled trees differ from XGBoost by {diff:.2e} (atol {atol:.0e})")
+    return diff
+
+def benchmark(model, compiled, X, repeats=3):
+    """Rows/second of XGBClassifier.predict_proba vs the compiled evaluator, best of `repeats`."""
+    X32 = np.asarray(X, dtype=np.float32)
+    results = {}
+    for name, fn in (('xgboost', lambda: model.predict_proba(X)), ('compiled', lambda: compiled.predict_proba(X32))):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        results[name] = len(X) / best
+    return results
+
+def main():
+    from ai_allocator import SmartAllocator
+    from train_agent_model import load_data, preprocess_data, train_model
+
+    print("=== Allocator model ===")
+    allocator = SmartAllocator()
+    allocator.load_data()
+    allocator.train_engine()
+    allocator_X = allocator.interactions.merge(allocator.tasks, on='task_id').merge(allocator.agents, on='agent_id')
+    for col, le in allocator.label_encoders.items():
+        allocator_X[f'{col}_encoded'] = le.transform(allocator_X[col])
+    allocator_X = allocator_X[allocator.feature_columns]
+
+    print("=== Agent recommendation model ===")
+    agents_df, tasks_df, interactions_df = load_data()
+    agent_X, y, _ = preprocess_data(agents_df, tasks_df, interactions_df)
+    agent_X = agent_X.astype(np.float32)
+    agent_model, _ = train_model(agent_X, y)
+
+    for name, model, X in (('allocator', allocator.model, allocator_X), ('agent', agent_model, agent_X)):
+        compiled = compile_booster(model.get_booster())
+        diff = check_parity(model, compiled, X)
+        speed = benchmark(model, compiled, X)
+        print(f"\n{name}: {len(compiled.roots)} trees, {len(compiled.feature)} nodes, depth {compiled.max_depth}")
+        print(f"Parity: max |diff| = {diff:.2e}")
+        print(f"Throughput: xgboost {speed['xgboost']:,.0f} rows/s, compiled {speed['compiled']:,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Parallel hyperparameter search for the allocator, agent recommendation,
+agent performance (forecasting) and SLA risk models.
+
+Each model's training matrix is built once and cached on disk
+(tuning_cache/<study>.npz, rebuilt when the data files change). Worker
+processes load it once, and for the XGBoost models wrap it once in a
+QuantileDMatrix, so trials only pay for training.
+
+Search: successive halving. Random configurations are trained with a small
+resource (boosting rounds / trees), the best 1/eta move on to eta times the
+resource, and so on. XGBoost trials also early-stop on the validation set.
+Every finished trial is appended to tuning_results.jsonl.
+
+    best = tune('allocator', n_trials=27, budget_seconds=300)
+"""
+import numpy as np
+import json
+import os
+import time
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeout
+
+from parallel_scoring import spawn_pool
+
+# --- CONFIG ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), 'data')
+CACHE_DIR = os.path.join(SCRIPT_DIR, 'tuning_cache')
+RESULTS_PATH = os.path.join(SCRIPT_DIR, 'tuning_results.jsonl')
+SOURCE_FILES = ['agents.csv', 'tasks.csv', 'interactions.csv']
+
+# --- TRAINING MATRICES ---
+def _split(X, y):
+    from sklearn.model_selection import train_test_split
+    # Same split as the training scripts
+    X_train, X_valid, y_train, y_valid = train_test_split(
+        np.asarray(X, dtype=np.float32), np.asarray(y, dtype=np.float32), test_size=0.2, random_state=42)
+    return {'X_train': X_train, 'y_train': y_train, 'X_valid': X_valid, 'y_valid': y_valid}
+
+def _build_allocator():
+    from ai_allocator import SmartAllocator
+    allocator = SmartAllocator()
+    allocator.load_data()
+    return _split(*allocator.build_training_data())
+
+def _build_agent():
+    from train_agent_model import load_data, preprocess_data
+    X, y, _ = preprocess_data(*load_data())
+    return _split(X.astype(np.float32), y)
+
+def _build_forecaster():
+    from train_forecasting_model import load_data, aggregate_weekly_metrics, feature_engineering
+    agents, interactions = load_data()
+    X, y = feature_engineering(aggregate_weekly_metrics(interactions, agents))
+    return _split(X.astype(np.float32), y)
+
+def _build_sla():
+    from train_sla_risk_model import load_data, feature_engineering
+    from inference import sla_features
+    df = feature_engineering(*load_data())
+    X = sla_features(df['days_overdue'], df['total_attempts'], df['is_paid'])
+    return _split(X, df['high_risk_flag'])
+
+def _sources_stamp():
+    return {name: os.path.getmtime(os.path.join(DATA_DIR, name)) for name in SOURCE_FILES
+            if os.path.exists(os.path.join(DATA_DIR, name))}
+
+def training_matrix(study, rebuild=False):
+    """Returns the path of the study's cached (X_train, y_train, X_valid, y_valid) arrays, building them if stale."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f'{study}.npz')
+    stamp = json.dumps(_sources_stamp(), sort_keys=True)
+    if not rebuild and os.path.exists(path):
+        with np.load(path) as cached:
+            if str(cached['sources']) == stamp:
+                return path
+    print(f"Building training matrix for {study}...")
+    arrays = STUDIES[study]['build']()
+    np.savez(path, sources=np.array(stamp), **arrays)
+    return path
+
+# --- TRIALS ---
+def _fit_xgb(data, params, resource, nthread):
+    import xgboost as xgb
+    if 'dtrain' not in data:
+        # Quantized once per worker, shared by every trial of the study
+        data['dtrain'] = xgb.QuantileDMatrix(data['X_train'], data['y_train'])
+        data['dvalid'] = xgb.QuantileDMatrix(data['X_valid'], data['y_valid'], ref=data['dtrain'])
+    booster = xgb.train(
+        {**params, 'objective': 'binary:logistic', 'eval_metric': 'logloss', 'tree_method': 'hist',
+         'nthread': nthread, 'seed': 42},
+        data['dtrain'], num_boost_round=resource, evals=[(data['dvalid'], 'valid')],
+        early_stopping_rounds=20, verbose_eval=False)
+    return float(booster.best_score), {'best_iteration': int(booster.best_iteration)}
+
+def _fit_forest(data, params, resource, nthread):
+    from sklearn.ensemble import RandomForestRegressor
+    model = RandomForestRegressor(n_estimators=resource, random_state=42, n_jobs=nthread, **params)
+    model.fit(data['X_train'], data['y_train'])
+    rmse = np.sqrt(np.mean((model.predict(data['X_valid']) - data['y_valid']) ** 2))
+    return float(rmse), {}
+
+def _fit_logistic(data, params, resource, nthread):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import log_loss
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler().fit(data['X_train'])
+    model = LogisticRegression(class_weight='balanced', max_iter=resource, random_state=42, **params)
+    model.fit(scaler.transform(data['X_train']), data['y_train'])
+    probs = model.predict_proba(scaler.transform(data['X_valid']))[:, 1]
+    return float(log_loss(data['y_valid'], probs, labels=[0, 1])), {}
+
+# Search spaces: (kind, low, high) or ('choice', options)
+XGB_SPACE = {
+    'max_depth': ('int', 3, 10),
+    'learning_rate': ('log', 0.01, 0.3),
+    'subsample': ('float', 0.6, 1.0),
+    'colsample_bytree': ('float', 0.6, 1.0),
+    'min_child_weight': ('log', 1.0, 10.0),
+    'reg_lambda': ('log', 0.1, 10.0),
+}
+
+STUDIES = {
+    # resource: boosting rounds / trees / solver iterations, from min to max
+    'allocator': {'build': _build_allocator, 'fit': _fit_xgb, 'space': XGB_SPACE,
+                  'min_resource': 50, 'max_resource': 450, 'metric': 'logloss'},
+    'agent': {'build': _build_agent, 'fit': _fit_xgb, 'space': XGB_SPACE,
+              'min_resource': 50, 'max_resource': 450, 'metric': 'logloss'},
+    'forecaster': {'build': _build_forecaster, 'fit': _fit_forest, 'metric': 'rmse',
+                   'space': {'max_depth': ('choice', [8, 12, 16, 25, None]),
+                             'min_samples_leaf': ('int', 1, 10),
+                             'max_features': ('choice', [1.0, 0.5, 'sqrt'])},
+                   'min_resource': 50, 'max_resource': 450},
+    'sla': {'build': _build_sla, 'fit': _fit_logistic, 'metric': 'logloss',
+            'space': {'C': ('log', 0.01, 10000.0)},
+            'min_resource': 100, 'max_resource': 100},
+}
+
+def sample_params(space, rng):
+    params = {}
+    for name, spec in space.items():
+        kind = spec[0]
+        if kind == 'int':
+            params[name] = int(rng.integers(spec[1], spec[2] + 1))
+        elif kind == 'float':
+            params[name] = float(rng.uniform(spec[1], spec[2]))
+        elif kind == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(spec[1]), np.log(spec[2]))))
+        else:
+            options = spec[1]
+            params[name] = options[int(rng.integers(len(options)))]
+    return params
+
+# --- WORKERS ---
+_nthread = 1
+_datasets = {}
+
+def _init_worker(nthread):
+    global _nthread
+    _nthread = nthread
+
+def _run_trial(study, cache_path, params, resource):
+    if study not in _datasets:
+        with np.load(cache_path) as cached:
+            _datasets[study] = {k: cached[k] for k in ('X_train', 'y_train', 'X_valid', 'y_valid')}
+    start = time.perf_counter()
+    metric, extra = STUDIES[study]['fit'](_datasets[study], params, resource, _nthread)
+    return metric, extra, time.perf_counter() - start
+
+# --- SEARCH ---
+def tune(study, n_trials=27, eta=3, budget_seconds=600, n_jobs=None, results_path=RESULTS_PATH, seed=42):
+    """
+    Successive halving over n_trials random configurations of `study`.
+
+    Rungs train with min_resource, min_resource * eta, ... up to max_resource;
+    after each rung the best 1/eta configurations (lower metric is better)
+    move on. No new trial starts after budget_seconds; trials already
+    running then are allowed to finish.
+
+    Returns the best trial of the highest rung reached, as a dict.
+    """
+    spec = STUDIES[study]
+    cache_path = training_matrix(study)
+    rng = np.random.default_rng(seed)
+    configs = [sample_params(spec['space'], rng) for _ in range(n_trials)]
+
+    resources = [spec['min_resource']]
+    while resources[-1] * eta <= spec['max_resource']:
+        resources.append(resources[-1] * eta)
+
+    n_jobs = n_jobs or os.cpu_count()
+    deadline = time.monotonic() + budget_seconds
+    survivors = list(range(n_trials))
+    best = None
+
+    with spawn_pool(n_jobs, _init_worker, (max(1, os.cpu_count() // n_jobs),)) as pool, \
+            open(results_path, 'a') as results_file:
+        for rung, resource in enumerate(resources):
+            futures = {pool.submit(_run_trial, study, cache_path, configs[t], resource): t for t in survivors}
+            scores = {}
+
+            def record(future):
+                t = futures[future]
+                metric, extra, seconds = future.result()
+                scores[t] = metric
+                results_file.write(json.dumps({
+                    'study': study, 'trial': t, 'rung': rung, 'resource': resource, 'params': configs[t],
+                    spec['metric']: metric, 'seconds': round(seconds, 3), 'timestamp': time.time(), **extra}) + '\n')
+                results_file.flush()
+
+            try:
+                for future in as_completed(futures, timeout=max(0.0, deadline - time.monotonic())):
+                    record(future)
+            except FuturesTimeout:
+                # Out of budget: drop trials that have not started, let the running ones finish
+                for future in futures:
+                    if not future.cancel() and futures[future] not in scores:
+                        record(future)
+                print(f"{study}: wall-clock budget reached during rung {rung}")
+
+            if scores:
+                top = min(scores, key=scores.get)
+                best = {'study': study, 'trial': top, 'rung': rung, 'resource': resource,
+                        'params': configs[top], spec['metric']: scores[top]}
+            print(f"{study} rung {rung}: {len(scores)}/{len(survivors)} trials at resource {resource}, "
+                  f"best {spec['metric']} {min(scores.values()) if scores else float('nan'):.5f}")
+            if time.monotonic() >= deadline or len(scores) < len(survivors):
+                break
+            survivors = sorted(scores, key=scores.get)[:max(1, len(scores) // eta)]
+    return best
+
+def main():
+    for study in STUDIES:
+        best = tune(study, budget_seconds=300)
+        print(f"\nBest {study}: {json.dumps(best)}\n")
+    print(f"Trials recorded in {RESULTS_PATH}")
+
+if __name__ == "__main__":
+    main()